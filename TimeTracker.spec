@@ -1,7 +1,7 @@
 # -*- mode: python ; coding: utf-8 -*-
 from PyInstaller.utils.hooks import collect_all
 
-datas = [('dashboard.py', '.'), ('tracker.py', '.'), ('settings_ui.py', '.')]
+datas = [('dashboard.py', '.'), ('tracker.py', '.'), ('settings_ui.py', '.'), ('probes.py', '.'), ('writer.py', '.'), ('cache.py', '.'), ('aggregation.py', '.'), ('title_rules.py', '.'), ('archive.py', '.'), ('range_analytics.py', '.'), ('queries.py', '.'), ('profiling.py', '.'), ('scheduler.py', '.'), ('ingest.py', '.'), ('db_pool.py', '.'), ('category_rules.py', '.')]
 binaries = []
 hiddenimports = ['streamlit', 'pandas', 'plotly', 'win32timezone']
 tmp_ret = collect_all('streamlit')
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Dict
+
+
+def format_duration_clean(seconds):
+    if pd.isna(seconds):
+        return "0m"
+    h = int(seconds // 3600)
+    m = int((seconds % 3600) // 60)
+    if h > 0:
+        return f"{h}h {m}m"
+    return f"{m}m"
+
+def format_durations(seconds: pd.Series) -> pd.Series:
+    """Versão vetorizada de format_duration_clean para uma série inteira."""
+    values = seconds.fillna(0).astype(float)
+    h = (values // 3600).astype(int).astype(str)
+    m = ((values % 3600) // 60).astype(int).astype(str)
+    return pd.Series(np.where(values >= 3600, h + "h " + m + "m", m + "m"), index=seconds.index)
+
+@dataclass
+class DaySummary:
+    """Agregados de um dia, calculados uma vez e consumidos por todos os gráficos."""
+    total_seconds: float = 0.0
+    sessions: int = 0
+    # display_name, duration_seconds, formatted_time (ordem decrescente de tempo)
+    app_totals: pd.DataFrame = field(default_factory=pd.DataFrame)
+    # hour, display_name, duration_seconds, duration_minutes, formatted_time
+    hourly: pd.DataFrame = field(default_factory=pd.DataFrame)
+    # category, duration_seconds, formatted_time (ordem decrescente de tempo)
+    category_totals: pd.DataFrame = field(default_factory=pd.DataFrame)
+    # display_name, clean_title, duration_seconds, formatted_time (ordem decrescente de tempo)
+    title_totals: pd.DataFrame = field(default_factory=pd.DataFrame)
+    color_map: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def apps(self):
+        """Apps do dia, do mais usado para o menos usado."""
+        return self.app_totals['display_name'].tolist() if not self.app_totals.empty else []
+
+    def titles_for(self, display_name: str) -> pd.DataFrame:
+        if self.title_totals.empty:
+            return self.title_totals
+        return self.title_totals[self.title_totals['display_name'] == display_name]
+
+
+def _totals(df: pd.DataFrame, by) -> pd.DataFrame:
+    totals = (
+        df.groupby(by, sort=False)['duration_seconds'].sum()
+        .sort_values(ascending=False)
+        .reset_index()
+    )
+    totals['formatted_time'] = format_durations(totals['duration_seconds'])
+    return totals
+
+def build_day_summary(df_hourly: pd.DataFrame, df_sessions: pd.DataFrame) -> DaySummary:
+    """
+    Monta o DaySummary a partir do rollup por hora (apps, horas, categorias)
+    e das sessões brutas do dia (títulos de janela, coluna clean_title).
+    """
+    summary = DaySummary()
+
+    if not df_hourly.empty:
+        summary.total_seconds = float(df_hourly['duration_seconds'].sum())
+        summary.sessions = int(df_hourly['sessions'].sum())
+
+        hourly = df_hourly.groupby(['hour', 'display_name'])['duration_seconds'].sum().reset_index()
+        hourly['duration_minutes'] = hourly['duration_seconds'] / 60
+        hourly['formatted_time'] = format_durations(hourly['duration_seconds'])
+        summary.hourly = hourly
+
+        # Totais por app saem da matriz hora x app já reduzida
+        summary.app_totals = _totals(hourly, 'display_name')
+        summary.category_totals = _totals(df_hourly, 'category')
+
+        colors = df_hourly[['display_name', 'hex_color']].dropna().drop_duplicates('display_name')
+        colors = colors[colors['hex_color'] != '']
+        summary.color_map = dict(zip(colors['display_name'], colors['hex_color']))
+
+    if not df_sessions.empty:
+        # clean_title já vem materializado/limpo por load_data
+        summary.title_totals = _totals(df_sessions, ['display_name', 'clean_title'])
+
+    return summary
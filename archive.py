@@ -0,0 +1,171 @@
+import os
+import sqlite3
+import datetime
+import logging
+from typing import List, Optional, Set, Tuple
+
+from tracker import DB_NAME, ProductivityTracker
+
+# Camada fria: um diretório por mês (particionamento hive: month=YYYY-MM)
+ARCHIVE_DIR_NAME = "archive"
+
+# Colunas gravadas nos arquivos Parquet (mesmas da visão activity_sessions)
+ARCHIVE_COLUMNS = ["id", "app_name", "window_title", "clean_title", "start_time", "end_time", "duration_seconds"]
+
+
+def default_archive_dir(db_path: str = DB_NAME) -> str:
+    """Diretório do arquivo morto, ao lado do banco."""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), ARCHIVE_DIR_NAME)
+
+def month_bounds_ms(month: str) -> Tuple[int, int]:
+    """Retorna o intervalo [início, fim) de um mês local 'YYYY-MM' em epoch (ms)."""
+    start = datetime.datetime.strptime(month, "%Y-%m")
+    end = (start + datetime.timedelta(days=32)).replace(day=1)
+    return int(start.timestamp() * 1000), int(end.timestamp() * 1000)
+
+def months_between(start_ms: int, end_ms: int) -> List[str]:
+    """Meses locais ('YYYY-MM') tocados pelo intervalo [start_ms, end_ms)."""
+    current = datetime.datetime.fromtimestamp(start_ms / 1000).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    last = datetime.datetime.fromtimestamp((end_ms - 1) / 1000)
+    months = []
+    while current <= last:
+        months.append(current.strftime("%Y-%m"))
+        current = (current + datetime.timedelta(days=32)).replace(day=1)
+    return months
+
+def has_archive(archive_dir: str) -> bool:
+    return os.path.isdir(archive_dir) and any(name.startswith("month=") for name in os.listdir(archive_dir))
+
+def archived_months(archive_dir: str) -> List[str]:
+    """Meses ('YYYY-MM') que já têm partição no arquivo morto."""
+    if not os.path.isdir(archive_dir):
+        return []
+    return sorted(name[len("month="):] for name in os.listdir(archive_dir) if name.startswith("month="))
+
+def partition_state(archive_dir: str, months: List[str]) -> Tuple:
+    """Arquivos (nome, mtime, tamanho) das partições dos meses: muda quando uma parte é gravada."""
+    state = []
+    for month in months:
+        partition_dir = os.path.join(archive_dir, f"month={month}")
+        if not os.path.isdir(partition_dir):
+            continue
+        for entry in sorted(os.scandir(partition_dir), key=lambda entry: entry.name):
+            info = entry.stat()
+            state.append((month, entry.name, info.st_mtime_ns, info.st_size))
+    return tuple(state)
+
+def write_month_part(archive_dir: str, month: str, rows: List[tuple]) -> str:
+    """
+    Grava `rows` (tuplas na ordem de ARCHIVE_COLUMNS) como um arquivo Parquet na partição do mês.
+    O nome vem da faixa de ids, então repetir a gravação do mesmo lote sobrescreve o mesmo arquivo.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = list(zip(*rows))
+    table = pa.table({
+        "id": pa.array(columns[0], pa.int64()),
+        "app_name": pa.array(columns[1], pa.string()),
+        "window_title": pa.array(columns[2], pa.string()),
+        "clean_title": pa.array(columns[3], pa.string()),
+        "start_time": pa.array(columns[4], pa.int64()),
+        "end_time": pa.array(columns[5], pa.int64()),
+        "duration_seconds": pa.array(columns[6], pa.float64()),
+    })
+
+    partition_dir = os.path.join(archive_dir, f"month={month}")
+    os.makedirs(partition_dir, exist_ok=True)
+    ids = columns[0]
+    path = os.path.join(partition_dir, f"part-{min(ids)}-{max(ids)}.parquet")
+    pq.write_table(table, path, compression="zstd")
+    return path
+
+def archive_closed_months(db_path: str = DB_NAME, archive_dir: Optional[str] = None,
+                          before: Optional[str] = None) -> int:
+    """
+    Move os meses fechados do activity_log para arquivos Parquet particionados por mês.
+
+    Meses anteriores a `before` ('YYYY-MM', padrão: mês atual) são arquivados. Cada mês é
+    gravado em disco antes de ser apagado do SQLite; o rollup por hora é mantido, então
+    a lista de datas e a visão geral continuam funcionando. Retorna o total de linhas movidas.
+    """
+    archive_dir = archive_dir or default_archive_dir(db_path)
+    before = before or datetime.date.today().strftime("%Y-%m")
+    cutoff_ms, _ = month_bounds_ms(before)
+
+    ProductivityTracker(db_path)  # garante o esquema atual
+    conn = sqlite3.connect(db_path)
+    moved = 0
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT MIN(start_time) FROM activity_log WHERE start_time < ?", (cutoff_ms,))
+        oldest = cursor.fetchone()[0]
+        if oldest is None:
+            logging.info("Nenhum mês fechado para arquivar.")
+            return 0
+
+        for month in months_between(oldest, cutoff_ms):
+            start_ms, end_ms = month_bounds_ms(month)
+            cursor.execute(f"""
+                SELECT {", ".join(ARCHIVE_COLUMNS)}
+                FROM activity_sessions
+                WHERE start_time >= ? AND start_time < ?
+                ORDER BY start_time
+            """, (start_ms, end_ms))
+            rows = cursor.fetchall()
+            if not rows:
+                continue
+
+            # Nome determinístico: repetir após uma falha sobrescreve o mesmo arquivo
+            path = write_month_part(archive_dir, month, rows)
+
+            cursor.execute("DELETE FROM activity_log WHERE start_time >= ? AND start_time < ?", (start_ms, end_ms))
+            conn.commit()
+            moved += len(rows)
+            logging.info(f"Mês {month} arquivado: {len(rows)} registros em {path}")
+    finally:
+        conn.close()
+    return moved
+
+def archived_session_keys(archive_dir: str, month: str) -> Set[tuple]:
+    """Chaves de conteúdo (app, título, início, fim) das sessões já arquivadas no mês."""
+    import pyarrow.dataset as ds
+
+    partition_dir = os.path.join(archive_dir, f"month={month}")
+    if not os.path.isdir(partition_dir):
+        return set()
+    table = ds.dataset(partition_dir, format="parquet").to_table(
+        columns=["app_name", "window_title", "start_time", "end_time"]
+    )
+    return set(zip(*(table.column(name).to_pylist() for name in table.column_names)))
+
+def load_archived_sessions(start_ms: int, end_ms: int, archive_dir: str):
+    """
+    Lê do arquivo morto as sessões com start_time em [start_ms, end_ms) como DataFrame.
+    Só as partições dos meses do intervalo são abertas, e o filtro de start_time é
+    aplicado na leitura dos row groups (predicate pushdown).
+    """
+    import pyarrow.dataset as ds
+
+    months = months_between(start_ms, end_ms)
+    dataset = ds.dataset(archive_dir, format="parquet", partitioning="hive")
+    month_field = ds.field("month")
+    start_field = ds.field("start_time")
+    table = dataset.to_table(
+        columns=ARCHIVE_COLUMNS,
+        filter=month_field.isin(months) & (start_field >= start_ms) & (start_field < end_ms)
+    )
+    return table.to_pandas()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Arquiva meses fechados em Parquet")
+    parser.add_argument("--db", default=DB_NAME, help="Caminho do banco SQLite")
+    parser.add_argument("--dir", default=None, help="Diretório do arquivo morto (padrão: ./archive)")
+    parser.add_argument("--before", default=None, help="Arquiva meses anteriores a YYYY-MM (padrão: mês atual)")
+    args = parser.parse_args()
+
+    total = archive_closed_months(args.db, args.dir, args.before)
+    logging.info(f"Arquivamento concluído: {total} registros movidos.")
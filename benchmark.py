@@ -0,0 +1,219 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import datetime
+import platform
+import statistics
+import subprocess
+import logging
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+import queries
+from aggregation import build_day_summary
+from datagen import generate_database
+from range_analytics import load_range_summary, period_bounds
+from tracker import ProductivityTracker, day_bounds_ms
+from writer import ActivityWriter
+
+# Tamanhos padrão do banco (linhas no activity_log)
+DEFAULT_SIZES = [1000, 100000, 10000000]
+
+# Bancos gerados ficam em cache aqui (mesmo tamanho + semente = mesmo banco)
+DEFAULT_WORKDIR = "bench_data"
+
+# Último dia dos bancos gerados: fixo, para que toda execução meça exatamente os mesmos dados
+BENCH_END_DATE = datetime.date(2024, 12, 31)
+
+# Regressão sinalizada no --compare quando o tempo cresce mais que isso (1.2 = +20%)
+REGRESSION_THRESHOLD = 1.2
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment() -> dict:
+    return {
+        "git_rev": git_revision(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+
+def time_call(func: Callable, repeat: int) -> List[float]:
+    """Executa `func` `repeat` vezes e retorna os tempos (s)."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+def result(name: str, size: int, timings: List[float], ops: int = 1, rows: Optional[int] = None) -> dict:
+    median = statistics.median(timings)
+    return {
+        "name": name,
+        "size": size,
+        "median_s": round(median, 6),
+        "min_s": round(min(timings), 6),
+        "repeat": len(timings),
+        "ops": ops,
+        "ops_per_s": round(ops / median, 1) if median > 0 else None,
+        "rows": rows,
+    }
+
+def prepare_database(size: int, workdir: str, seed: int) -> str:
+    """Gera (ou reaproveita) o banco sintético de `size` linhas."""
+    os.makedirs(workdir, exist_ok=True)
+    db_path = os.path.join(workdir, f"bench_{size}_s{seed}_{BENCH_END_DATE:%Y%m%d}.db")
+    if not os.path.exists(db_path):
+        logging.info(f"Gerando banco de {size} registros em {db_path}...")
+        generate_database(db_path, rows=size, seed=seed, end_date=BENCH_END_DATE)
+    return db_path
+
+def busiest_day(conn) -> str:
+    """Dia com mais sessões (pior caso do carregamento diário)."""
+    row = conn.execute("""
+        SELECT day FROM activity_hourly
+        GROUP BY day ORDER BY SUM(sessions) DESC LIMIT 1
+    """).fetchone()
+    return row[0]
+
+def bench_inserts(db_path: str, size: int, writer_rows: int, direct_rows: int) -> List[dict]:
+    """
+    Vazão de gravação em um banco já com `size` linhas. As sessões são gravadas em um dia
+    futuro e removidas ao final, para não alterar o banco reaproveitado.
+    """
+    bench_day = BENCH_END_DATE + datetime.timedelta(days=2)
+    day_start_ms, _ = day_bounds_ms(bench_day)
+    base = day_start_ms / 1000
+    results = []
+
+    def sessions(count: int, offset: float):
+        # Sessões de 1.5s alternando entre apps/títulos já conhecidos e novos
+        for n in range(count):
+            start = base + offset + n * 1.5
+            yield f"bench{n % 7}.exe", f"Benchmark {n % 50}", start, start + 1.5
+
+    tracker = ProductivityTracker(db_path)
+    try:
+        writer = ActivityWriter(db_path, batch_size=50, flush_interval=2.0)
+        writer.start()
+        started = time.perf_counter()
+        for session in sessions(writer_rows, 0):
+            writer.submit(*session)
+        writer.flush(timeout=None)
+        elapsed = time.perf_counter() - started
+        writer.close()
+        results.append(result("insert_writer", size, [elapsed], ops=writer_rows))
+
+        started = time.perf_counter()
+        for session in sessions(direct_rows, writer_rows * 1.5):
+            tracker.save_activity(*session)
+        elapsed = time.perf_counter() - started
+        results.append(result("insert_direct", size, [elapsed], ops=direct_rows))
+    finally:
+        conn = sqlite3.connect(db_path)
+        conn.execute("DELETE FROM activity_log WHERE start_time >= ?", (day_start_ms,))
+        conn.execute("DELETE FROM activity_hourly WHERE day >= ?", (bench_day.strftime("%Y-%m-%d"),))
+        conn.execute("DELETE FROM apps WHERE name LIKE 'bench%.exe'")
+        conn.execute("DELETE FROM window_titles WHERE title LIKE 'Benchmark %'")
+        conn.commit()
+        conn.close()
+    return results
+
+def bench_reads(db_path: str, size: int, repeat: int) -> List[dict]:
+    """Consultas e agregações do dashboard sobre o dia mais cheio, o mês e o ano dele."""
+    tracker = ProductivityTracker(db_path)
+    conn = sqlite3.connect(db_path)
+    results = []
+    try:
+        day = busiest_day(conn)
+        day_date = datetime.datetime.strptime(day, "%Y-%m-%d").date()
+
+        df_sessions = queries.fetch_day_sessions(conn, day)
+        df_hourly = queries.fetch_hourly_rollup(conn, day)
+
+        cases = [
+            ("available_dates", lambda: queries.fetch_available_dates(conn), None),
+            ("day_load", lambda: queries.fetch_day_sessions(conn, day), len(df_sessions)),
+            ("day_rollup", lambda: queries.fetch_hourly_rollup(conn, day), len(df_hourly)),
+            ("day_summary", lambda: build_day_summary(df_hourly, df_sessions), len(df_sessions)),
+            ("get_all_apps", tracker.get_all_apps, None),
+        ]
+        for mode in ("month", "year"):
+            start, end = period_bounds(mode, day_date)
+            cases.append((f"range_{mode}", lambda s=start, e=end: load_range_summary(s, e, db_path), None))
+
+        for name, func, rows in cases:
+            results.append(result(name, size, time_call(func, repeat), rows=rows))
+    finally:
+        conn.close()
+    return results
+
+def run_benchmarks(sizes: List[int], workdir: str = DEFAULT_WORKDIR, repeat: int = 5, seed: int = 0,
+                   writer_rows: int = 5000, direct_rows: int = 200) -> dict:
+    """Executa a suíte para cada tamanho e retorna o relatório (serializável em JSON)."""
+    report = {"environment": environment(), "results": []}
+    for size in sizes:
+        db_path = prepare_database(size, workdir, seed)
+        report["results"].extend(bench_reads(db_path, size, repeat))
+        report["results"].extend(bench_inserts(db_path, size, writer_rows, direct_rows))
+        logging.info(f"Benchmarks de {size} registros concluídos.")
+    return report
+
+def compare_reports(baseline: dict, current: dict, threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Compara dois relatórios e retorna as linhas de regressão (tempo/baseline > threshold)."""
+    previous: Dict[tuple, dict] = {(r["name"], r["size"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for entry in current["results"]:
+        old = previous.get((entry["name"], entry["size"]))
+        if not old or not old["median_s"]:
+            continue
+        ratio = entry["median_s"] / old["median_s"]
+        line = f"{entry['name']:<16} {entry['size']:>10}  {old['median_s']:.4f}s -> {entry['median_s']:.4f}s  x{ratio:.2f}"
+        if ratio > threshold:
+            regressions.append(line)
+        logging.info(line)
+    return regressions
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Suíte de benchmarks (ingestão, consultas e agregações)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Tamanhos do banco (linhas)")
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR, help="Diretório dos bancos gerados")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetições por consulta (usa a mediana)")
+    parser.add_argument("--seed", type=int, default=0, help="Semente do gerador de dados")
+    parser.add_argument("--writer-rows", type=int, default=5000, help="Sessões gravadas via ActivityWriter")
+    parser.add_argument("--direct-rows", type=int, default=200, help="Sessões gravadas via save_activity direto")
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--compare", default=None, help="Relatório JSON anterior para comparação")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.sizes, args.workdir, args.repeat, args.seed, args.writer_rows, args.direct_rows)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare_reports(json.load(f), report)
+        if regressions:
+            logging.warning("Regressões detectadas:\n" + "\n".join(regressions))
+            sys.exit(1)
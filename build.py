@@ -72,6 +72,19 @@ def build_exe():
         '--add-data=dashboard.py;.',     
         '--add-data=tracker.py;.',       
         '--add-data=settings_ui.py;.',   
+        '--add-data=probes.py;.',        
+        '--add-data=writer.py;.',        
+        '--add-data=cache.py;.',         
+        '--add-data=aggregation.py;.',   
+        '--add-data=title_rules.py;.',   
+        '--add-data=archive.py;.',       
+        '--add-data=range_analytics.py;.',
+        '--add-data=queries.py;.',       
+        '--add-data=profiling.py;.',     
+        '--add-data=scheduler.py;.',     
+        '--add-data=ingest.py;.',        
+        '--add-data=db_pool.py;.',       
+        '--add-data=category_rules.py;.',
         
         # Imports ocultos
         '--hidden-import=streamlit',
@@ -0,0 +1,74 @@
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Tuple
+
+from db_pool import connect_read_only
+from tracker import DB_NAME
+
+
+class DataVersionCache:
+    """
+    Cache LRU de resultados de consultas, invalidado pelo marcador de mudança do banco.
+
+    O marcador é o PRAGMA data_version de uma conexão dedicada e de longa duração:
+    ele muda sempre que outra conexão (tracker, writer, telas de configuração) faz
+    commit. Cada entrada é guardada com a versão em que foi carregada, então uma
+    escrita torna todas obsoletas e elas saem do cache pelo LRU.
+
+    Os valores devolvidos são compartilhados entre reruns: não devem ser alterados.
+    """
+
+    def __init__(self, db_path: str = DB_NAME, max_entries: int = 32):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Conexão só de leitura: o data_version muda apenas com commits de outras conexões
+        self._conn = connect_read_only(db_path, cache_kib=64, mmap_bytes=0)
+        self.hits = 0
+        self.misses = 0
+
+    def data_version(self) -> int:
+        """Retorna o marcador de mudança atual do banco."""
+        with self._lock:
+            try:
+                return self._conn.execute("PRAGMA data_version").fetchone()[0]
+            except sqlite3.Error as e:
+                logging.error(f"Erro ao ler data_version: {e}")
+                return -1
+
+    def get(self, name: str, args: Tuple[Hashable, ...], loader: Callable[[], Any]) -> Any:
+        """Retorna o resultado em cache para (name, args) ou executa `loader` e o guarda."""
+        version = self.data_version()
+        key = (name, args, version)
+
+        with self._lock:
+            if version >= 0 and key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = loader()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
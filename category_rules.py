@@ -0,0 +1,105 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Regra de categorização: (campo, padrão, é_regex, categoria). Campo: "app" ou "title".
+CategoryRule = Tuple[str, str, bool, str]
+
+RULE_FIELDS = ("app", "title")
+
+UNCATEGORIZED = "Sem Categoria"
+
+# Sintaxe do editor de texto: "[app:][re:]padrão => Categoria" (sem "app:", o padrão vale para o título)
+APP_PREFIX = "app:"
+REGEX_PREFIX = "re:"
+ARROW = "=>"
+
+# Regras padrão: abas de navegador categorizadas pelo site
+DEFAULT_CATEGORY_RULES: List[CategoryRule] = [
+    ("title", "YouTube", False, "Lazer"),
+    ("title", "Netflix", False, "Lazer"),
+    ("title", "GitHub", False, "Desenvolvimento"),
+    ("title", "Stack Overflow", False, "Desenvolvimento"),
+    ("title", "Gmail", False, "Comunicação"),
+    ("title", "WhatsApp", False, "Comunicação"),
+]
+
+class CategoryMatcher:
+    """
+    Regras compiladas em uma expressão por campo (app e título), avaliadas uma vez por (app, título).
+
+    Cada regra vira uma alternativa ancorada no início do campo (lookahead), então '^' e '$'
+    valem para o nome do app ou para o título, como o usuário escreveu. A alternância é testada
+    na ordem, e entre os dois campos vence a regra de menor posição: a primeira regra que casar.
+    Padrões literais são buscados como trecho, sem diferenciar maiúsculas.
+    """
+
+    def __init__(self, rules: Iterable[CategoryRule]):
+        self.categories: List[str] = []
+        parts: Dict[str, List[str]] = {field: [] for field in RULE_FIELDS}
+        for field, pattern, is_regex, category in rules:
+            if not pattern or not category:
+                continue
+            body = pattern if is_regex else re.escape(pattern)
+            parts["app" if field == "app" else "title"].append(
+                f"(?=.*?(?:{body}))(?P<r{len(self.categories)}>)"
+            )
+            self.categories.append(category)
+        self._patterns = {
+            field: re.compile("|".join(field_parts), re.IGNORECASE | re.DOTALL)
+            for field, field_parts in parts.items() if field_parts
+        }
+
+    def match(self, app_name: Optional[str], window_title: Optional[str]) -> Optional[str]:
+        """Categoria da primeira regra que casar (None se nenhuma)."""
+        values = {"app": app_name or "", "title": window_title or ""}
+        first = None
+        for field, pattern in self._patterns.items():
+            found = pattern.match(values[field])
+            if found is not None:
+                index = int(found.lastgroup[1:])
+                first = index if first is None else min(first, index)
+        return None if first is None else self.categories[first]
+
+    def resolve(self, app_name: Optional[str], window_title: Optional[str],
+                app_categories: Dict[str, Optional[str]]) -> Optional[str]:
+        """Regras primeiro; sem regra, a categoria manual do app (app_settings). None = sem categoria."""
+        category = self.match(app_name, window_title) or app_categories.get(app_name)
+        return None if category == UNCATEGORIZED else category or None
+
+def parse_rules_text(text: str) -> List[CategoryRule]:
+    """
+    Converte o texto do editor (uma regra por linha, "padrão => Categoria") em regras.
+    Prefixos: 'app:' casa com o nome do executável (senão, com o título); 're:' indica regex.
+    ValueError indica linha sem categoria; re.error, regex inválida (validada já dentro da
+    expressão única do CategoryMatcher).
+    """
+    rules: List[CategoryRule] = []
+    for number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        pattern, arrow, category = line.rpartition(ARROW)
+        category = category.strip()
+        if not arrow or not category:
+            raise ValueError(f"linha {number}: use 'padrão {ARROW} Categoria'")
+
+        field = "title"
+        pattern = pattern.strip()
+        if pattern.startswith(APP_PREFIX):
+            field = "app"
+            pattern = pattern[len(APP_PREFIX):].lstrip()
+        is_regex = pattern.startswith(REGEX_PREFIX)
+        if is_regex:
+            pattern = pattern[len(REGEX_PREFIX):]
+        if not pattern:
+            raise ValueError(f"linha {number}: padrão vazio")
+        rules.append((field, pattern, is_regex, category))
+    CategoryMatcher(rules)
+    return rules
+
+def format_rules_text(rules: Iterable[CategoryRule]) -> str:
+    """Operação inversa de parse_rules_text."""
+    lines = []
+    for field, pattern, is_regex, category in rules:
+        prefix = (APP_PREFIX if field == "app" else "") + (REGEX_PREFIX if is_regex else "")
+        lines.append(f"{prefix}{pattern} {ARROW} {category}")
+    return "\n".join(lines)
@@ -0,0 +1,152 @@
+import sqlite3
+import datetime
+import logging
+from typing import List, Optional
+
+from tracker import DB_NAME, ProductivityTracker, day_bounds_ms, rebuild_hourly_rollup
+
+# Dias já compactados (a compactação roda de forma incremental sobre dias fechados)
+COMPACTION_LOG_DDL = """
+    CREATE TABLE IF NOT EXISTS compaction_log (
+        day TEXT PRIMARY KEY,
+        compacted_at INTEGER NOT NULL,
+        rows_before INTEGER NOT NULL,
+        rows_after INTEGER NOT NULL
+    )
+"""
+
+
+def compact_day(cursor, day: str, min_blip_seconds: float = 0.0, max_gap_seconds: float = 2.0) -> int:
+    """
+    Compacta as sessões de um dia e retorna quantas linhas foram removidas.
+
+    Linhas contíguas (intervalo <= `max_gap_seconds`) do mesmo app/título são unidas;
+    se `min_blip_seconds` > 0, trocas mais curtas que isso são absorvidas pela sessão
+    anterior. As uniões nunca atravessam a virada de hora, para que o rollup por hora
+    continue exato, e as durações são somadas, então o tempo total do dia não muda.
+    """
+    start_ms, end_ms = day_bounds_ms(day)
+    cursor.execute("""
+        SELECT id, app_id, title_id, start_time, end_time, duration_seconds
+        FROM activity_log
+        WHERE start_time >= ? AND start_time < ?
+        ORDER BY start_time, id
+    """, (start_ms, end_ms))
+    rows = cursor.fetchall()
+
+    max_gap_ms = max_gap_seconds * 1000
+    kept: List[list] = []
+    changed = set()
+    removed: List[int] = []
+
+    for row_id, app_id, title_id, start, end, duration in rows:
+        hour = datetime.datetime.fromtimestamp(start / 1000).hour
+        prev = kept[-1] if kept else None
+        contiguous = (
+            prev is not None
+            and prev[6] == hour
+            and prev[4] is not None
+            and start - prev[4] <= max_gap_ms
+        )
+        same_session = contiguous and prev[1] == app_id and prev[2] == title_id
+        is_blip = contiguous and min_blip_seconds > 0 and (duration or 0) < min_blip_seconds
+
+        if same_session or is_blip:
+            prev[4] = max(prev[4], end or start)
+            prev[5] = (prev[5] or 0) + (duration or 0)
+            changed.add(prev[0])
+            removed.append(row_id)
+            continue
+
+        kept.append([row_id, app_id, title_id, start, end, duration, hour])
+
+    if not removed:
+        return 0
+
+    cursor.executemany(
+        "UPDATE activity_log SET end_time = ?, duration_seconds = ? WHERE id = ?",
+        [(row[4], row[5], row[0]) for row in kept if row[0] in changed]
+    )
+    cursor.executemany("DELETE FROM activity_log WHERE id = ?", [(row_id,) for row_id in removed])
+    # Blips absorvidos mudam o tempo por app: o rollup do dia é recalculado
+    rebuild_hourly_rollup(cursor, day)
+    return len(removed)
+
+def reclaim_space(conn: sqlite3.Connection, max_pages: Optional[int] = None):
+    """
+    Devolve ao sistema as páginas livres do banco via vácuo incremental.
+    Bancos criados antes do auto_vacuum=INCREMENTAL passam por um VACUUM completo uma única vez.
+    """
+    mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    if mode != 2:
+        logging.info("Convertendo o banco para auto_vacuum=INCREMENTAL (VACUUM completo, uma vez)...")
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+        return
+
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if free_pages:
+        if max_pages:
+            conn.execute(f"PRAGMA incremental_vacuum({int(max_pages)})")
+        else:
+            conn.execute("PRAGMA incremental_vacuum")
+        logging.info(f"Vácuo incremental: {free_pages} páginas livres liberadas.")
+
+def compact_closed_days(db_path: str = DB_NAME, min_blip_seconds: float = 0.0,
+                        max_gap_seconds: float = 2.0, vacuum: bool = True) -> int:
+    """Compacta os dias fechados (anteriores a hoje) ainda não compactados. Retorna linhas removidas."""
+    ProductivityTracker(db_path)  # garante o esquema atual
+    conn = sqlite3.connect(db_path)
+    total_removed = 0
+    try:
+        cursor = conn.cursor()
+        cursor.execute(COMPACTION_LOG_DDL)
+        today = datetime.date.today().strftime("%Y-%m-%d")
+        cursor.execute("""
+            SELECT DISTINCT h.day
+            FROM activity_hourly h
+            LEFT JOIN compaction_log c ON c.day = h.day
+            WHERE h.day < ? AND c.day IS NULL
+            ORDER BY h.day
+        """, (today,))
+        days = [row[0] for row in cursor.fetchall()]
+
+        for day in days:
+            start_ms, end_ms = day_bounds_ms(day)
+            cursor.execute(
+                "SELECT COUNT(*) FROM activity_log WHERE start_time >= ? AND start_time < ?",
+                (start_ms, end_ms)
+            )
+            rows_before = cursor.fetchone()[0]
+            removed = compact_day(cursor, day, min_blip_seconds, max_gap_seconds) if rows_before else 0
+            cursor.execute("""
+                INSERT OR REPLACE INTO compaction_log (day, compacted_at, rows_before, rows_after)
+                VALUES (?, strftime('%s', 'now') * 1000, ?, ?)
+            """, (day, rows_before, rows_before - removed))
+            # Um commit por dia: a tarefa pode ser interrompida e retomada
+            conn.commit()
+            total_removed += removed
+            if removed:
+                logging.info(f"Dia {day} compactado: {rows_before} -> {rows_before - removed} registros")
+
+        if vacuum and total_removed:
+            reclaim_space(conn)
+    finally:
+        conn.close()
+    return total_removed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compacta sessões contíguas de dias fechados")
+    parser.add_argument("--db", default=DB_NAME, help="Caminho do banco SQLite")
+    parser.add_argument("--min-blip", type=float, default=0.0,
+                        help="Absorve trocas mais curtas que N segundos na sessão anterior")
+    parser.add_argument("--max-gap", type=float, default=2.0,
+                        help="Intervalo máximo (s) entre linhas consideradas contíguas")
+    parser.add_argument("--no-vacuum", action="store_true", help="Não executa o vácuo incremental")
+    args = parser.parse_args()
+
+    removed = compact_closed_days(args.db, args.min_blip, args.max_gap, vacuum=not args.no_vacuum)
+    logging.info(f"Compactação concluída: {removed} registros removidos.")
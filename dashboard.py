@@ -2,20 +2,100 @@ import streamlit as st
 import pandas as pd
 import sqlite3
 import os
+import time
+import logging
+import threading
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 
 from tracker import ProductivityTracker
+import archive
+from cache import DataVersionCache
+from db_pool import ReadOnlyPool
+from aggregation import build_day_summary, format_durations
+from title_rules import compile_title_rules
+from range_analytics import PERIOD_MODES, load_range_summary, period_bounds
+import profiling
+import queries
 import settings_ui
+from profiling import span
 
 # Configuração da Página
 st.set_page_config(page_title="Monitor de Produtividade", layout="wide", page_icon="⏱️")
 
 DB_NAME = "productivity.db"
+ARCHIVE_DIR = archive.default_archive_dir(DB_NAME)
+
+# Ociosidade (s) após a qual o processo se encerra; definida pelo main.py ao subir o dashboard
+DASHBOARD_IDLE_ENV = "TIMETRACKER_DASHBOARD_IDLE"
+
+# Intervalo (s) da verificação de PRAGMA data_version no modo de atualização automática
+AUTO_REFRESH_SECONDS = 5
+
+# Sessões por página nas tabelas de histórico
+HISTORY_PAGE_SIZE = 50
 
 # --- Funções do Banco de Dados ---
 
+@st.cache_resource
+def get_query_cache():
+    """Cache de consultas do processo, invalidado pelo data_version do banco."""
+    return DataVersionCache(DB_NAME)
+
+@st.cache_resource
+def get_read_pool():
+    """Conexões somente leitura compartilhadas pelo processo (todas as consultas do dashboard)."""
+    return ReadOnlyPool(DB_NAME)
+
+@st.cache_resource
+def get_day_frames():
+    """Sessões por dia mantidas em memória e atualizadas só pela cauda (ids novos)."""
+    return queries.DayFrameStore()
+
+@st.cache_resource
+def init_dashboard_db():
+    """
+    Esquema/migrações e tabela do diário, uma vez por processo (e não a cada rerun).
+    Retorna o ProductivityTracker usado pelas telas de configuração.
+    """
+    tracker = ProductivityTracker(DB_NAME)
+    init_journal_db()
+    return tracker
+
+def count_active_sessions():
+    """Sessões de navegador conectadas ao servidor (None se a API interna não estiver disponível)."""
+    try:
+        from streamlit import runtime
+        return runtime.get_instance()._session_mgr.num_active_sessions()
+    except Exception:
+        return None
+
+@st.cache_resource
+def start_idle_watchdog():
+    """
+    Encerra o processo do dashboard depois de DASHBOARD_IDLE_ENV segundos sem sessões abertas.
+    Sem a contagem de sessões, usa o tempo desde a última execução do script.
+    """
+    timeout = float(os.environ.get(DASHBOARD_IDLE_ENV, "0") or 0)
+    if timeout <= 0:
+        return None
+
+    state = {"last_active": time.monotonic()}
+
+    def watch():
+        while True:
+            time.sleep(max(1.0, min(30.0, timeout / 4)))
+            sessions = count_active_sessions()
+            if sessions:
+                state["last_active"] = time.monotonic()
+            elif time.monotonic() - state["last_active"] >= timeout:
+                logging.info(f"Dashboard ocioso há {timeout:.0f}s; encerrando o processo.")
+                os._exit(0)
+
+    threading.Thread(target=watch, name="IdleWatchdog", daemon=True).start()
+    return state
+
 def init_journal_db():
     try:
         conn = sqlite3.connect(DB_NAME)
@@ -33,11 +113,10 @@ def init_journal_db():
 
 def get_journal_entry(date_obj):
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute("SELECT content FROM journal_entries WHERE entry_date = ?", (str(date_obj),))
-        row = cursor.fetchone()
-        conn.close()
+        with get_read_pool().connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT content FROM journal_entries WHERE entry_date = ?", (str(date_obj),))
+            row = cursor.fetchone()
         return row[0] if row else ""
     except Exception:
         return ""
@@ -57,97 +136,322 @@ def save_journal_entry(date_obj, content):
         st.error(f"Erro ao salvar: {e}")
         return False
 
-def load_data():
-    """Carrega dados do SQLite e faz pré-processamento."""
+def get_available_dates():
+    """Lista os dias com atividade (mais recente primeiro) a partir do rollup por hora."""
     try:
-        # Abre conexão em modo leitura
-        conn = sqlite3.connect(DB_NAME)
-        
-        # Query unificada
-        query = """
-            SELECT l.*, 
-                   COALESCE(s.display_name, l.app_name) as display_name,
-                   s.hex_color,
-                   s.category
-            FROM activity_log l
-            LEFT JOIN app_settings s ON l.app_name = s.app_name
-        """
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-
-        if df.empty:
-            return pd.DataFrame()
-
-        df['start_time'] = pd.to_datetime(df['start_time'], format='mixed', errors='coerce')
-        df['end_time'] = pd.to_datetime(df['end_time'], format='mixed', errors='coerce')
-        df = df.dropna(subset=['start_time'])
+        with get_read_pool().connection() as conn:
+            return queries.fetch_available_dates(conn)
+    except Exception as e:
+        st.error(f"Erro ao listar datas: {e}")
+        return []
 
-        df['date'] = df['start_time'].dt.date
-        df['hour'] = df['start_time'].dt.hour
-        df['category'] = df['category'].fillna("Sem Categoria")
-        
-        return df
+def load_data(day, title_pattern=None):
+    """Carrega as sessões do dia informado (SQLite + arquivo Parquet), já pré-processadas."""
+    try:
+        with get_read_pool().connection() as conn, span("load_data"):
+            return get_day_frames().get(conn, day, title_pattern, ARCHIVE_DIR)
     except Exception as e:
         st.error(f"Erro ao carregar banco de dados: {e}")
         return pd.DataFrame()
 
-def format_duration_clean(seconds):
-    if pd.isna(seconds):
-        return "0m"
-    h = int(seconds // 3600)
-    m = int((seconds % 3600) // 60)
-    if h > 0:
-        return f"{h}h {m}m"
-    return f"{m}m"
-
-def clean_window_title(title):
-    """Remove sufixos comuns de navegadores para limpar o gráfico."""
-    if not title:
-        return "Sem Título"
-    
-    # Lista de sufixos para remover e deixar apenas o nome do site/página
-    suffixes_to_remove = [
-        " - Opera",
-        " - Google Chrome",
-        " - Microsoft Edge",
-        " - Mozilla Firefox",
-        " - Brave",
-        " - Vivaldi",
-        " - YouTube"
-    ]
-    
-    clean = str(title)
-    for suffix in suffixes_to_remove:
-        if suffix in clean:
-            clean = clean.replace(suffix, "")
-    
-    return clean
+def load_hourly_rollup(day):
+    """Carrega o rollup (hora x app) de um dia, já com as configurações de exibição."""
+    try:
+        with get_read_pool().connection() as conn, span("load_hourly_rollup"):
+            return queries.fetch_hourly_rollup(conn, day)
+    except Exception as e:
+        st.error(f"Erro ao carregar resumo por hora: {e}")
+        return pd.DataFrame()
+
+def load_title_pattern(query_cache, tracker):
+    """Regex compilada das regras de limpeza de títulos."""
+    rules = query_cache.get("title_rules", (), tracker.get_title_rules)
+    return query_cache.get("title_pattern", (), lambda: compile_title_rules(rules))
+
+def load_day_data(query_cache, tracker, day):
+    """Sessões do dia (em cache por versão dos dados)."""
+    title_pattern = load_title_pattern(query_cache, tracker)
+    return query_cache.get("load_data", (day,), lambda: load_data(day, title_pattern))
+
+def load_day_summary(query_cache, tracker, day):
+    """Agregados do dia (DaySummary), calculados uma vez por versão dos dados."""
+    def build():
+        df_hourly = query_cache.get("hourly_rollup", (day,), lambda: load_hourly_rollup(day))
+        df_sessions = load_day_data(query_cache, tracker, day)
+        with span("aggregation.day_summary"):
+            return build_day_summary(df_hourly, df_sessions)
+    return query_cache.get("day_summary", (day,), build)
+
+def load_session_page(query_cache, tracker, day, df_day, after=None, app=None, category=None, title=None,
+                      total=None):
+    """
+    Uma página do histórico do dia, paginada no SQL por (start_time, id).
+    Dias já arquivados em Parquet não estão no SQLite: paginam o DataFrame do dia já carregado.
+    `total` é o total contado na primeira página dos mesmos filtros.
+    """
+    title_pattern = load_title_pattern(query_cache, tracker)
+
+    def load():
+        # Mês arquivado: as sessões só existem no DataFrame do dia (cursores e filtros do pandas)
+        if str(day)[:7] in archive.archived_months(ARCHIVE_DIR):
+            return queries.page_frame(df_day, HISTORY_PAGE_SIZE, after, app, category, title)
+        try:
+            with get_read_pool().connection() as conn, span("load_session_page"):
+                return queries.fetch_sessions_page(conn, day, HISTORY_PAGE_SIZE, after,
+                                                   app, category, title, title_pattern, total)
+        except Exception as e:
+            st.error(f"Erro ao carregar histórico: {e}")
+            return queries.SessionPage(pd.DataFrame(), None, 0)
+    return query_cache.get("session_page", (day, after, app, category, title), load)
+
+def current_page_cursor(key, signature):
+    """
+    Cursor da página atual da tabela `key` e o total já contado (None na primeira página,
+    que recalcula); volta para a primeira página quando dia/filtros mudam.
+    """
+    state = st.session_state.get(key)
+    if state is None or state["signature"] != signature:
+        state = st.session_state[key] = {"signature": signature, "cursors": [None], "total": None}
+    cursor = state["cursors"][-1]
+    return cursor, None if cursor is None else state["total"]
+
+def render_page_nav(key, page):
+    """Botões de página anterior/próxima da tabela `key`."""
+    state = st.session_state[key]
+    state["total"] = page.total
+    cursors = state["cursors"]
+    total_pages = max(1, -(-page.total // HISTORY_PAGE_SIZE))
+
+    col_prev, col_info, col_next = st.columns([1, 3, 1])
+    if col_prev.button("◀ Anterior", key=f"{key}_prev", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    col_info.caption(f"Página {len(cursors)} de {total_pages} · {page.total} sessões")
+    if col_next.button("Próxima ▶", key=f"{key}_next", disabled=page.next_cursor is None):
+        cursors.append(page.next_cursor)
+        st.rerun()
+
+def render_range_view(query_cache, start_date, end_date):
+    """Visão de vários dias (semana/mês/ano/intervalo), agregada em SQL sobre o rollup."""
+    def load():
+        with get_read_pool().connection() as conn, span("load_range_summary"):
+            return load_range_summary(start_date, end_date, DB_NAME, conn=conn)
+    summary = query_cache.get("range_summary", (start_date, end_date), load)
+    st.subheader(f"📅 {start_date.strftime('%d/%m/%Y')} — {end_date.strftime('%d/%m/%Y')}")
+
+    if summary.app_totals.empty:
+        st.info("Sem atividades no período.")
+        return
+
+    color_map = dict(summary.app_totals.dropna(subset=['hex_color'])[['display_name', 'hex_color']].values)
+    avg_seconds = summary.total_seconds / max(summary.days_with_data, 1)
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Tempo Total", format_durations(pd.Series([summary.total_seconds]))[0])
+    with col2:
+        st.metric("Média por Dia", format_durations(pd.Series([avg_seconds]))[0])
+    with col3:
+        st.metric("Dias com Registro", summary.days_with_data)
+    with col4:
+        st.metric("App Mais Usado", summary.app_totals['display_name'].iloc[0])
+
+    st.markdown("---")
+    col_r1, col_r2 = st.columns(2)
+
+    with col_r1, span("chart.range_ranking"):
+        st.subheader("Ranking no Período")
+        top_apps = summary.app_totals.head(15)
+        fig_apps = px.bar(
+            top_apps,
+            x='duration_seconds',
+            y='display_name',
+            orientation='h',
+            text='formatted_time',
+            color='display_name',
+            color_discrete_map=color_map,
+            color_discrete_sequence=px.colors.qualitative.Alphabet
+        )
+        fig_apps.update_traces(hovertemplate="<b>%{y}</b><br>⏱️ %{text}<extra></extra>")
+        fig_apps.update_layout(
+            showlegend=False, xaxis_title=None, yaxis_title=None,
+            height=100 + (len(top_apps) * 35),
+            margin=dict(l=0, r=0, t=10, b=0),
+            yaxis=dict(autorange="reversed"),
+            xaxis=dict(showticklabels=False, showgrid=False, zeroline=False)
+        )
+        st.plotly_chart(fig_apps, use_container_width=True)
+
+    with col_r2, span("chart.range_categories"):
+        st.subheader("Categorias")
+        fig_cat = px.pie(
+            summary.category_totals,
+            values='duration_seconds',
+            names='category',
+            custom_data=['formatted_time']
+        )
+        fig_cat.update_traces(hovertemplate="<b>%{label}</b><br>⏱️ %{customdata[0]}<br>📊 %{percent}")
+        st.plotly_chart(fig_cat, use_container_width=True)
+
+    st.markdown("---")
+    with span("chart.range_heatmap"):
+        st.subheader("Mapa de Calor (Dia x Hora)")
+        heat = (
+            summary.heatmap.pivot(index='day', columns='hour', values='duration_seconds')
+            .reindex(columns=range(24))
+            .fillna(0) / 60
+        )
+        fig_heat = px.imshow(
+            heat,
+            labels={'x': 'Hora', 'y': 'Dia', 'color': 'Min'},
+            color_continuous_scale='Blues',
+            aspect='auto'
+        )
+        fig_heat.update_xaxes(tickmode='linear', dtick=1)
+        fig_heat.update_layout(height=max(300, 20 * len(heat)), margin=dict(l=0, r=0, t=10, b=0))
+        st.plotly_chart(fig_heat, use_container_width=True)
+
+    with span("chart.range_trend"):
+        st.subheader("Tendência Diária")
+        daily = summary.daily.copy()
+        daily['duration_hours'] = daily['duration_seconds'] / 3600
+        delta = daily['delta_seconds'].fillna(0)
+        daily['delta_str'] = delta.ge(0).map({True: "+", False: "-"}) + format_durations(delta.abs())
+        fig_trend = px.bar(
+            daily,
+            x='day',
+            y='duration_hours',
+            labels={'day': 'Dia', 'duration_hours': 'Horas'},
+            custom_data=['formatted_time', 'delta_str']
+        )
+        fig_trend.update_traces(
+            hovertemplate="<b>%{x}</b><br>⏱️ %{customdata[0]}<br>📈 %{customdata[1]} vs. dia anterior<extra></extra>"
+        )
+        st.plotly_chart(fig_trend, use_container_width=True)
+
+def _watch_data_version():
+    """Verificação barata (PRAGMA data_version); redesenha a página só se algo foi gravado."""
+    if get_query_cache().data_version() != st.session_state.get("seen_data_version"):
+        st.rerun()
+
+# st.fragment (Streamlit >= 1.37) reexecuta só esta função a cada AUTO_REFRESH_SECONDS
+watch_data_version = (
+    st.fragment(run_every=AUTO_REFRESH_SECONDS)(_watch_data_version) if hasattr(st, "fragment") else None
+)
+
+def render_refresh_controls(query_cache):
+    """Botão de atualização e modo automático (atualiza os gráficos quando houver escrita)."""
+    if st.sidebar.button("Atualizar Dados"):
+        st.rerun()
+
+    auto = st.sidebar.toggle("🔄 Atualização automática", key="auto_refresh")
+    st.session_state["seen_data_version"] = query_cache.data_version()
+    if auto:
+        if watch_data_version is None:
+            st.sidebar.caption("Requer Streamlit 1.37 ou superior.")
+        else:
+            watch_data_version()
+
+def render_diagnostics_panel(query_cache):
+    """Painel oculto de diagnóstico: aparece com ?debug=1 na URL ou TIMETRACKER_DEBUG=1."""
+    if not (profiling.debug_enabled() or st.query_params.get("debug") == "1"):
+        return
+
+    with st.sidebar.expander("🩺 Diagnóstico"):
+        reports = {"dashboard": profiling.snapshot()}
+        tracker_report = profiling.load_json(profiling.TRACKER_PROFILE_FILE)
+        if tracker_report:
+            reports["tracker"] = tracker_report
+
+        for label, report in reports.items():
+            st.caption(f"Processo: {label} (pid {report['pid']})")
+            rows = [
+                {"span": name, **{k: v for k, v in stats.items() if k != "histogram"}}
+                for name, stats in report["spans"].items()
+            ]
+            if rows:
+                st.dataframe(
+                    pd.DataFrame(rows).sort_values("total_ms", ascending=False),
+                    use_container_width=True,
+                    hide_index=True
+                )
+            else:
+                st.info("Nenhum span registrado.")
+            if report.get("gauges"):
+                st.json(report["gauges"], expanded=False)
+
+        spans = reports["dashboard"]["spans"]
+        if spans:
+            selected_span = st.selectbox("Histograma", list(spans), key="diag_span")
+            st.bar_chart(pd.Series(spans[selected_span]["histogram"]))
+
+        cache_stats = query_cache.stats()
+        st.caption(f"Cache de consultas: {cache_stats['hits']} acertos, {cache_stats['misses']} falhas, "
+                   f"{cache_stats['entries']}/{cache_stats['max_entries']} entradas")
+        frame_stats = get_day_frames().stats()
+        st.caption(f"Sessões em memória: {frame_stats['days']} dias, {frame_stats['full_loads']} cargas "
+                   f"completas, {frame_stats['tail_loads']} atualizações pela cauda")
+        pool_stats = get_read_pool().stats()
+        st.caption(f"Conexões de leitura: {pool_stats['created']}/{pool_stats['size']} abertas, "
+                   f"{pool_stats['idle']} ociosas")
+
+        payload = {"processes": reports, "query_cache": cache_stats, "read_pool": pool_stats,
+                   "day_frames": frame_stats}
+        st.download_button("⬇️ Baixar JSON", profiling.to_json(payload),
+                           file_name="diagnostics.json", mime="application/json")
+        if st.button("Zerar contadores", key="diag_reset"):
+            profiling.TIMINGS.reset()
+            st.rerun()
 
 def main():
     st.title("📊 Painel de Produtividade Pessoal")
+
+    watchdog = start_idle_watchdog()
+    if watchdog is not None:
+        watchdog["last_active"] = time.monotonic()
     
     if 'limit_apps' not in st.session_state:
         st.session_state['limit_apps'] = 5
 
-    tracker = ProductivityTracker()
-    init_journal_db() 
-    settings_ui.render_settings_ui(tracker)
+    tracker = init_dashboard_db()
+    query_cache = get_query_cache()
+    settings_ui.render_settings_ui(tracker, query_cache)
+    settings_ui.render_title_rules_ui(tracker, query_cache)
+    settings_ui.render_category_rules_ui(tracker, query_cache)
+    render_diagnostics_panel(query_cache)
 
-    df_raw = load_data()
+    available_dates = query_cache.get("available_dates", (), get_available_dates)
 
-    if df_raw.empty:
+    if not available_dates:
         st.warning("Nenhum dado encontrado. Certifique-se de que o 'tracker.py' está rodando.")
         st.stop()
         return
 
     # --- Sidebar: Filtros ---
     st.sidebar.header("Filtros")
-    
-    available_dates = sorted(df_raw['date'].unique(), reverse=True)
-    
-    if not available_dates:
-        st.sidebar.write("Sem datas disponíveis.")
-        st.stop()
+
+    period_label = st.sidebar.radio("Período", list(PERIOD_MODES), horizontal=True)
+    period_mode = PERIOD_MODES[period_label]
+
+    if period_mode != "day":
+        if period_mode == "custom":
+            picked = st.sidebar.date_input(
+                "Intervalo",
+                value=(available_dates[-1], available_dates[0]),
+                min_value=available_dates[-1],
+                max_value=available_dates[0]
+            )
+            if len(picked) != 2:
+                st.info("Selecione a data inicial e a final.")
+                st.stop()
+            start_date, end_date = picked
+        else:
+            anchor = st.sidebar.selectbox("Data de Referência", options=available_dates, index=0)
+            start_date, end_date = period_bounds(period_mode, anchor)
+
+        render_refresh_controls(query_cache)
+        render_range_view(query_cache, start_date, end_date)
+        return
 
     selected_date = st.sidebar.selectbox(
         "Selecione a Data", 
@@ -155,24 +459,24 @@ def main():
         index=0
     )
 
-    df = df_raw[df_raw['date'] == selected_date].copy()
+    df = load_day_data(query_cache, tracker, selected_date)
+
+    if df.empty:
+        st.info("Sem sessões registradas para a data selecionada.")
+        st.stop()
     
+    summary = load_day_summary(query_cache, tracker, selected_date)
+
     # --- Mapa de Cores ---
-    color_map = {}
-    if 'hex_color' in df.columns:
-        settings_df = df[['display_name', 'hex_color']].drop_duplicates().dropna()
-        for _, row in settings_df.iterrows():
-            if row['hex_color']:
-                color_map[row['display_name']] = row['hex_color']
+    color_map = summary.color_map
 
-    if st.sidebar.button("Atualizar Dados"):
-        st.rerun()
+    render_refresh_controls(query_cache)
 
     # --- Diário ---
     st.sidebar.markdown("---")
     st.sidebar.subheader("📔 Diário de Feitos")
     
-    journal_content = get_journal_entry(selected_date)
+    journal_content = query_cache.get("journal", (selected_date,), lambda: get_journal_entry(selected_date))
     edit_key = f"edit_mode_{selected_date}"
     
     if edit_key not in st.session_state:
@@ -210,8 +514,9 @@ def main():
 
     # --- ABA 1: Visão Geral (Seu Dashboard Original) ---
     with tab_overview:
+        # Todos os gráficos consomem o DaySummary (uma passada sobre o rollup por hora)
         # Métricas
-        total_seconds = df['duration_seconds'].sum()
+        total_seconds = summary.total_seconds
         hours = int(total_seconds // 3600)
         minutes = int((total_seconds % 3600) // 60)
         
@@ -219,11 +524,10 @@ def main():
         with col1:
             st.metric("Tempo Total", f"{hours}h {minutes}m")
         with col2:
-            st.metric("Sessões (Focos)", len(df))
+            st.metric("Sessões (Focos)", summary.sessions)
         with col3:
-            usage_by_app = df.groupby('display_name')['duration_seconds'].sum().sort_values(ascending=False)
-            if not usage_by_app.empty:
-                st.metric("App Mais Usado", usage_by_app.index[0])
+            if summary.apps:
+                st.metric("App Mais Usado", summary.apps[0])
 
         st.markdown("---")
 
@@ -231,15 +535,11 @@ def main():
         row1_col1, row1_col2 = st.columns(2)
 
         # 1. Gráfico de Pizza
-        with row1_col1:
+        with row1_col1, span("chart.distribution"):
             st.subheader("Distribuição (Top 5)")
-            app_usage_s = df.groupby('display_name')['duration_seconds'].sum().sort_values(ascending=False).head(5)
+            app_usage_df = summary.app_totals.head(5)
             
-            if not app_usage_s.empty:
-                app_usage_df = app_usage_s.reset_index()
-                app_usage_df.columns = ['display_name', 'duration_seconds']
-                app_usage_df['formatted_time'] = app_usage_df['duration_seconds'].apply(format_duration_clean)
-                
+            if not app_usage_df.empty:
                 fig_donut = px.pie(
                     app_usage_df, 
                     values='duration_seconds', 
@@ -259,11 +559,9 @@ def main():
                 st.info("Sem dados.")
 
         # 2. Gráfico de Barras (Linha do Tempo)
-        with row1_col2:
+        with row1_col2, span("chart.hourly"):
             st.subheader("Linha do Tempo")
-            hourly_usage = df.groupby(['hour', 'display_name'])['duration_seconds'].sum().reset_index()
-            hourly_usage['duration_minutes'] = hourly_usage['duration_seconds'] / 60
-            hourly_usage['formatted_time'] = hourly_usage['duration_seconds'].apply(format_duration_clean)
+            hourly_usage = summary.hourly
             
             if not hourly_usage.empty:
                 fig_bar = px.bar(
@@ -289,12 +587,10 @@ def main():
         row2_col1, row2_col2 = st.columns(2)
 
         # 3. Gráfico Horizontal (Ranking)
-        with row2_col1:
+        with row2_col1, span("chart.ranking"):
             st.subheader(f"Ranking Detalhado")
-            app_usage_all = df.groupby('display_name')['duration_seconds'].sum().sort_values(ascending=False)
-            top_apps_view = app_usage_all.head(st.session_state['limit_apps']).reset_index()
-            top_apps_view['formatted_time'] = top_apps_view['duration_seconds'].apply(format_duration_clean)
-            top_apps_view = top_apps_view.sort_values(by='duration_seconds', ascending=False)
+            app_usage_all = summary.app_totals
+            top_apps_view = app_usage_all.head(st.session_state['limit_apps'])
 
             if not top_apps_view.empty:
                 fig_bar_h = px.bar(
@@ -331,71 +627,80 @@ def main():
                 st.info("Sem dados.")
 
         # 4. Gráfico de Categorias
-        with row2_col2:
+        with row2_col2, span("chart.categories"):
             st.subheader("Categorias")
-            if 'category' in df.columns:
-                cat_usage_s = df.groupby('category')['duration_seconds'].sum().sort_values(ascending=False)
-                
-                if not cat_usage_s.empty:
-                    cat_usage_df = cat_usage_s.reset_index()
-                    cat_usage_df.columns = ['category', 'duration_seconds']
-                    cat_usage_df['formatted_time'] = cat_usage_df['duration_seconds'].apply(format_duration_clean)
-                    
-                    fig_cat = px.pie(
-                        cat_usage_df, 
-                        values='duration_seconds', 
-                        names='category',
-                        custom_data=['formatted_time']
-                    )
-                    fig_cat.update_traces(
-                        hovertemplate="<b>%{label}</b><br>⏱️ %{customdata[0]}<br>📊 %{percent}"
-                    )
-                    st.plotly_chart(fig_cat, use_container_width=True)
-                else:
-                    st.info("Sem dados de categoria.")
+            cat_usage_df = summary.category_totals
+            
+            if not cat_usage_df.empty:
+                fig_cat = px.pie(
+                    cat_usage_df, 
+                    values='duration_seconds', 
+                    names='category',
+                    custom_data=['formatted_time']
+                )
+                fig_cat.update_traces(
+                    hovertemplate="<b>%{label}</b><br>⏱️ %{customdata[0]}<br>📊 %{percent}"
+                )
+                st.plotly_chart(fig_cat, use_container_width=True)
             else:
-                st.empty()
+                st.info("Sem dados de categoria.")
         
-        st.subheader("Linha do Tempo")
-        hourly_usage = df.groupby(['hour', 'display_name'])['duration_seconds'].sum().reset_index()
-        hourly_usage['duration_minutes'] = hourly_usage['duration_seconds'] / 60
-        hourly_usage['formatted_time'] = hourly_usage['duration_seconds'].apply(format_duration_clean)
+        with span("chart.timeline"):
+            st.subheader("Linha do Tempo")
+            hourly_usage = summary.hourly
         
-        if not hourly_usage.empty:
-            fig_bar = px.bar(
-                hourly_usage, 
-                x='hour', 
-                y='duration_minutes',
-                color='display_name',
-                labels={'hour': 'Hora', 'duration_minutes': 'Min', 'display_name': 'App'},
-                color_discrete_map=color_map,
-                color_discrete_sequence=px.colors.qualitative.Alphabet,
-                custom_data=['formatted_time']
-            )
-            fig_bar.update_xaxes(tickmode='linear', dtick=1, range=[-0.5, 23.5])
-            fig_bar.update_traces(
-                hovertemplate="<b>%{data.name}</b><br>🕒 Hora: %{x}h<br>⏱️ Tempo: %{customdata[0]}<extra></extra>"
-            )
-            fig_bar.update_layout(
-                height=500,  # aumenta ou diminui a altura
-                margin=dict(l=0, r=0, t=30, b=0)
-            )
-            st.plotly_chart(fig_bar, use_container_width=True, key="grafico2")
-        else:
-            st.info("Sem atividades.")
+            if not hourly_usage.empty:
+                fig_bar = px.bar(
+                    hourly_usage, 
+                    x='hour', 
+                    y='duration_minutes',
+                    color='display_name',
+                    labels={'hour': 'Hora', 'duration_minutes': 'Min', 'display_name': 'App'},
+                    color_discrete_map=color_map,
+                    color_discrete_sequence=px.colors.qualitative.Alphabet,
+                    custom_data=['formatted_time']
+                )
+                fig_bar.update_xaxes(tickmode='linear', dtick=1, range=[-0.5, 23.5])
+                fig_bar.update_traces(
+                    hovertemplate="<b>%{data.name}</b><br>🕒 Hora: %{x}h<br>⏱️ Tempo: %{customdata[0]}<extra></extra>"
+                )
+                fig_bar.update_layout(
+                    height=500,  # aumenta ou diminui a altura
+                    margin=dict(l=0, r=0, t=30, b=0)
+                )
+                st.plotly_chart(fig_bar, use_container_width=True, key="grafico2")
+            else:
+                st.info("Sem atividades.")
         
         st.markdown("---")
-        st.subheader("Histórico Detalhado")
-        
-        display_df = df[['start_time', 'end_time', 'display_name', 'window_title', 'duration_seconds', 'category']].copy()
-        display_df['duration_str'] = display_df['duration_seconds'].apply(lambda x: f"{int(x//60)}m {int(x%60)}s")
-        display_df = display_df.sort_values(by='start_time', ascending=False)
-        
-        st.dataframe(
-            display_df[['start_time', 'display_name', 'category', 'window_title', 'duration_str']], 
-            use_container_width=True,
-            hide_index=True
-        )
+        with span("chart.session_table"):
+            st.subheader("Histórico Detalhado")
+
+            # Filtros aplicados no SQL; só a página atual é carregada e desenhada
+            col_f1, col_f2, col_f3 = st.columns(3)
+            app_filter = col_f1.selectbox("App", ["Todos"] + summary.apps, key="hist_app")
+            category_options = summary.category_totals['category'].tolist() if not summary.category_totals.empty else []
+            category_filter = col_f2.selectbox("Categoria", ["Todas"] + category_options, key="hist_category")
+            title_filter = col_f3.text_input("Título contém", key="hist_title").strip()
+
+            filters = (
+                None if app_filter == "Todos" else app_filter,
+                None if category_filter == "Todas" else category_filter,
+                title_filter or None,
+            )
+            cursor, known_total = current_page_cursor("history_detail", (selected_date,) + filters)
+            page = load_session_page(query_cache, tracker, selected_date, df, cursor, *filters, total=known_total)
+
+            if page.df.empty:
+                st.info("Nenhuma sessão encontrada com esses filtros.")
+            else:
+                display_df = page.df[['start_time', 'display_name', 'category', 'window_title', 'duration_seconds']].copy()
+                seconds = display_df.pop('duration_seconds').fillna(0)
+                display_df['duration_str'] = (
+                    (seconds // 60).astype(int).astype(str) + "m " + (seconds % 60).astype(int).astype(str) + "s"
+                )
+                st.dataframe(display_df, use_container_width=True, hide_index=True)
+            render_page_nav("history_detail", page)
 
     # --- ABA 2: Detalhes por App (A SOLUÇÃO DO OPERA) ---
     with tab_details:
@@ -403,7 +708,7 @@ def main():
         st.caption("Selecione um aplicativo (como o Opera) para ver em quais abas ou arquivos você passou mais tempo.")
 
         # 1. Seletor de App
-        apps_list = df.groupby('display_name')['duration_seconds'].sum().sort_values(ascending=False).index.tolist()
+        apps_list = summary.apps
         
         # Tenta selecionar 'Opera' ou 'opera.exe' por padrão se existir
         default_index = 0
@@ -415,23 +720,14 @@ def main():
         selected_app_detail = st.selectbox("Selecione o Aplicativo:", apps_list, index=default_index)
 
         if selected_app_detail:
-            # Filtrar dados só deste app
-            df_app = df[df['display_name'] == selected_app_detail].copy()
-            
-            # Limpar títulos (Remover " - Opera", etc)
-            df_app['clean_title'] = df_app['window_title'].apply(clean_window_title)
-            
-            # Agrupar por Título da Janela (Aba)
-            title_usage = df_app.groupby('clean_title')['duration_seconds'].sum().sort_values(ascending=True).tail(15) # Top 15
+            # Títulos já limpos (sem " - Opera", etc) e agrupados no DaySummary
+            title_usage_df = summary.titles_for(selected_app_detail).head(15).iloc[::-1] # Top 15
             
             col_d1, col_d2 = st.columns([2, 1])
             
-            with col_d1:
+            with col_d1, span("chart.top_titles"):
                 st.subheader(f"Top Abas/Janelas em: {selected_app_detail}")
-                if not title_usage.empty:
-                    title_usage_df = title_usage.reset_index()
-                    title_usage_df['formatted_time'] = title_usage_df['duration_seconds'].apply(format_duration_clean)
-                    
+                if not title_usage_df.empty:
                     fig_titles = px.bar(
                         title_usage_df,
                         x='duration_seconds',
@@ -455,18 +751,31 @@ def main():
                 else:
                     st.info("Sem dados detalhados.")
 
-            with col_d2:
+            with col_d2, span("chart.app_history"):
                 st.subheader("Histórico Cronológico")
-                history_df = df_app[['start_time', 'clean_title', 'duration_seconds']].sort_values(by='start_time', ascending=False)
-                history_df['Hora'] = history_df['start_time'].dt.strftime('%H:%M')
-                history_df['Duração'] = history_df['duration_seconds'].apply(format_duration_clean)
-                
-                st.dataframe(
-                    history_df[['Hora', 'clean_title', 'Duração']],
-                    use_container_width=True,
-                    hide_index=True,
-                    height=500
+                app_title_filter = st.text_input("Título contém", key="app_history_title").strip() or None
+                cursor, known_total = current_page_cursor(
+                    "history_app", (selected_date, selected_app_detail, app_title_filter)
                 )
+                page = load_session_page(query_cache, tracker, selected_date, df, cursor,
+                                         app=selected_app_detail, title=app_title_filter, total=known_total)
+
+                history_df = page.df
+                if history_df.empty:
+                    st.info("Nenhuma sessão encontrada.")
+                else:
+                    history_df = history_df[['start_time', 'clean_title', 'duration_seconds']].copy()
+                    history_df['Hora'] = history_df['start_time'].dt.strftime('%H:%M')
+                    history_df['Duração'] = format_durations(history_df['duration_seconds'])
+
+                    st.dataframe(
+                        history_df[['Hora', 'clean_title', 'Duração']],
+                        use_container_width=True,
+                        hide_index=True,
+                        height=500
+                    )
+                render_page_nav("history_app", page)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with span("dashboard.main"):
+        main()
\ No newline at end of file
@@ -0,0 +1,192 @@
+import os
+import bisect
+import random
+import sqlite3
+import datetime
+import logging
+from typing import Iterator, List, Optional, Tuple
+
+from tracker import DB_NAME, ProductivityTracker, rebuild_hourly_rollup, recategorize_history, to_epoch_ms
+from title_rules import DEFAULT_TITLE_RULES, clean_title, compile_title_rules
+
+# Apps "reais" usados primeiro; acima disso os nomes são gerados (app21.exe, ...)
+BASE_APPS = [
+    "chrome.exe", "Code.exe", "explorer.exe", "Slack.exe", "Teams.exe", "OUTLOOK.EXE",
+    "WINWORD.EXE", "EXCEL.EXE", "opera.exe", "firefox.exe", "Spotify.exe", "WindowsTerminal.exe",
+    "Discord.exe", "Notion.exe", "Figma.exe", "msedge.exe", "pycharm64.exe", "Obsidian.exe",
+    "POWERPNT.EXE", "zoom.exe",
+]
+
+# Apps cujos títulos recebem o sufixo do navegador (limpo pelas regras padrão)
+BROWSER_SUFFIXES = {
+    "chrome.exe": " - Google Chrome",
+    "opera.exe": " - Opera",
+    "firefox.exe": " - Mozilla Firefox",
+    "msedge.exe": " - Microsoft Edge",
+}
+
+# Blocos de trabalho (hora local de início, hora de fim) em dias úteis e no fim de semana
+WEEKDAY_BLOCKS = [(9, 12), (13, 18)]
+WEEKEND_BLOCKS = [(14, 16)]
+
+# Duração mínima de uma sessão, como no tracker (trechos < 1s são descartados)
+MIN_SESSION_SECONDS = 1.0
+
+BATCH_SIZE = 50000
+
+
+def zipf_weights(count: int, exponent: float = 1.1) -> List[float]:
+    """Pesos de popularidade: poucos apps/títulos concentram a maior parte do tempo."""
+    return [1.0 / (rank ** exponent) for rank in range(1, count + 1)]
+
+def build_catalog(apps: int, titles_per_app: int) -> List[Tuple[str, List[str]]]:
+    """Lista de (app, títulos) com a cardinalidade pedida."""
+    catalog = []
+    for index in range(apps):
+        app_name = BASE_APPS[index] if index < len(BASE_APPS) else f"app{index + 1}.exe"
+        suffix = BROWSER_SUFFIXES.get(app_name, "")
+        titles = [f"{app_name.split('.')[0]} documento {n + 1}{suffix}" for n in range(titles_per_app)]
+        catalog.append((app_name, titles))
+    return catalog
+
+def hour_boundaries(day: datetime.date) -> List[float]:
+    """Timestamps das viradas de hora locais do dia (respeita horário de verão)."""
+    start = datetime.datetime.combine(day, datetime.time.min)
+    return [(start + datetime.timedelta(hours=hour)).timestamp() for hour in range(25)]
+
+def generate_sessions(days: int, end_date: datetime.date, catalog, switches_per_hour: float,
+                      rng: random.Random) -> Iterator[Tuple[int, int, float, float]]:
+    """
+    Gera sessões (índice do app, índice do título, início, fim) dia a dia, do mais antigo
+    para o mais recente, dentro dos blocos de trabalho.
+    """
+    app_weights = zipf_weights(len(catalog))
+    title_weights = zipf_weights(max(len(titles) for _, titles in catalog))
+    app_indexes = list(range(len(catalog)))
+    mean_dwell = 3600.0 / switches_per_hour
+
+    for offset in range(days, 0, -1):
+        day = end_date - datetime.timedelta(days=offset - 1)
+        blocks = WEEKEND_BLOCKS if day.weekday() >= 5 else WEEKDAY_BLOCKS
+        hours = hour_boundaries(day)
+        for first_hour, last_hour in blocks:
+            # Começo e fim do bloco variam alguns minutos, como em um dia real
+            current = hours[first_hour] + rng.uniform(0, 900)
+            block_end = hours[last_hour] - rng.uniform(0, 900)
+            while current < block_end:
+                app_index = rng.choices(app_indexes, app_weights)[0]
+                titles = catalog[app_index][1]
+                title_index = rng.choices(range(len(titles)), title_weights[:len(titles)])[0]
+                end = min(block_end, current + max(MIN_SESSION_SECONDS, rng.expovariate(1.0 / mean_dwell)))
+                yield app_index, title_index, current, end
+                current = end
+
+def split_rows(sessions, app_ids, title_ids, max_rows: Optional[int]):
+    """Divide as sessões nas viradas de hora (como insert_activity) e gera as linhas do activity_log."""
+    emitted = 0
+    boundaries: List[float] = []
+    for app_index, title_index, start, end in sessions:
+        if not boundaries or start >= boundaries[-1] or start < boundaries[0]:
+            boundaries = hour_boundaries(datetime.datetime.fromtimestamp(start).date())
+        current = start
+        position = bisect.bisect_right(boundaries, current)
+        while current < end:
+            current_end = min(end, boundaries[position]) if position < len(boundaries) else end
+            duration = current_end - current
+            if duration >= MIN_SESSION_SECONDS:
+                yield (app_ids[app_index], title_ids[app_index][title_index],
+                       to_epoch_ms(current), to_epoch_ms(current_end), duration)
+                emitted += 1
+                if max_rows is not None and emitted >= max_rows:
+                    return
+            current = current_end
+            position += 1
+
+def generate_database(db_path: str = DB_NAME, rows: Optional[int] = None, years: float = 1.0,
+                      apps: int = 20, titles_per_app: int = 50, switches_per_hour: float = 60.0,
+                      seed: int = 0, end_date: Optional[datetime.date] = None) -> int:
+    """
+    Cria um banco sintético realista (esquema atual, rollup e estatísticas prontos).
+
+    Com `rows`, a geração para ao atingir esse número de linhas; se o período em `years`
+    não comportar tantas linhas na taxa de trocas pedida, o período é estendido para trás.
+    Retorna o número de linhas inseridas no activity_log.
+    """
+    rng = random.Random(seed)
+    end_date = end_date or datetime.date.today() - datetime.timedelta(days=1)
+    days = max(1, int(round(years * 365)))
+    if rows is not None:
+        # ~40h de blocos por semana -> linhas por dia em média
+        rows_per_day = switches_per_hour * 40 / 7
+        days = max(days, int(rows / rows_per_day) + 2)
+
+    ProductivityTracker(db_path)  # cria/migra o esquema
+    conn = sqlite3.connect(db_path)
+    try:
+        # Carga em massa: durabilidade desnecessária, o banco pode ser recriado
+        conn.execute("PRAGMA synchronous=OFF")
+        cursor = conn.cursor()
+
+        catalog = build_catalog(apps, titles_per_app)
+        pattern = compile_title_rules(DEFAULT_TITLE_RULES)
+        cursor.executemany("INSERT OR IGNORE INTO apps (name) VALUES (?)", [(name,) for name, _ in catalog])
+        cursor.executemany(
+            "INSERT OR IGNORE INTO window_titles (title, clean_title) VALUES (?, ?)",
+            [(title, clean_title(title, pattern)) for _, titles in catalog for title in titles]
+        )
+        app_ids = dict(cursor.execute("SELECT name, id FROM apps").fetchall())
+        title_map = dict(cursor.execute("SELECT title, id FROM window_titles").fetchall())
+        app_id_list = [app_ids[name] for name, _ in catalog]
+        title_id_list = [[title_map[title] for title in titles] for _, titles in catalog]
+
+        sessions = generate_sessions(days, end_date, catalog, switches_per_hour, rng)
+        inserted = 0
+        batch = []
+        for row in split_rows(sessions, app_id_list, title_id_list, rows):
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                cursor.executemany("""
+                    INSERT INTO activity_log (app_id, title_id, start_time, end_time, duration_seconds)
+                    VALUES (?, ?, ?, ?, ?)
+                """, batch)
+                inserted += len(batch)
+                batch.clear()
+        if batch:
+            cursor.executemany("""
+                INSERT INTO activity_log (app_id, title_id, start_time, end_time, duration_seconds)
+                VALUES (?, ?, ?, ?, ?)
+            """, batch)
+            inserted += len(batch)
+
+        # Categorias pelas regras padrão, antes de construir o rollup completo
+        recategorize_history(cursor, rebuild_rollup=False)
+        rebuild_hourly_rollup(cursor)
+        conn.commit()
+        cursor.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+    logging.info(f"Banco sintético {db_path}: {inserted} registros, {apps} apps, "
+                 f"{apps * titles_per_app} títulos, {days} dias")
+    return inserted
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Gera um banco de atividades sintético e realista")
+    parser.add_argument("--db", default="synthetic.db", help="Caminho do banco a gerar")
+    parser.add_argument("--rows", type=int, default=None, help="Número de registros (padrão: todo o período)")
+    parser.add_argument("--years", type=float, default=1.0, help="Período coberto, em anos")
+    parser.add_argument("--apps", type=int, default=20, help="Quantidade de apps distintos")
+    parser.add_argument("--titles-per-app", type=int, default=50, help="Títulos distintos por app")
+    parser.add_argument("--switches-per-hour", type=float, default=60.0, help="Trocas de janela por hora")
+    parser.add_argument("--seed", type=int, default=0, help="Semente do gerador")
+    parser.add_argument("--force", action="store_true", help="Apaga o banco existente antes de gerar")
+    args = parser.parse_args()
+
+    if args.force and os.path.exists(args.db):
+        os.remove(args.db)
+    generate_database(args.db, args.rows, args.years, args.apps, args.titles_per_app,
+                      args.switches_per_hour, args.seed)
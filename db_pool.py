@@ -0,0 +1,103 @@
+import os
+import queue
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from urllib.request import pathname2url
+
+from tracker import DB_NAME
+
+# Ajustes das conexões de leitura: cache de páginas (KiB) e janela de mmap (bytes)
+READ_CACHE_KIB = 16 * 1024
+READ_MMAP_BYTES = 256 * 1024 * 1024
+# Tempo máximo (s) aguardando uma conexão livre quando o pool está cheio
+ACQUIRE_TIMEOUT = 10.0
+
+
+def connect_read_only(db_path: str, cache_kib: int = READ_CACHE_KIB,
+                      mmap_bytes: int = READ_MMAP_BYTES) -> sqlite3.Connection:
+    """Abre uma conexão somente leitura (mode=ro + query_only) com cache e mmap ajustados."""
+    uri = f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conn.execute("PRAGMA query_only=ON")
+    conn.execute(f"PRAGMA cache_size=-{int(cache_kib)}")
+    conn.execute(f"PRAGMA mmap_size={int(mmap_bytes)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+class ReadOnlyPool:
+    """
+    Pool de conexões somente leitura (mode=ro + query_only), compartilhado pelo processo.
+
+    As conexões são criadas sob demanda até `size` e reaproveitadas entre reruns do
+    dashboard, então nenhum rerun paga abertura de conexão; por serem somente leitura,
+    nunca disputam o lock de escrita com o tracker (WAL permite leitura concorrente).
+    """
+
+    def __init__(self, db_path: str = DB_NAME, size: int = 4, cache_kib: int = READ_CACHE_KIB,
+                 mmap_bytes: int = READ_MMAP_BYTES):
+        self.db_path = db_path
+        self.size = size
+        self.cache_kib = cache_kib
+        self.mmap_bytes = mmap_bytes
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        return connect_read_only(self.db_path, self.cache_kib, self.mmap_bytes)
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except sqlite3.Error:
+                    self._created -= 1
+                    raise
+        return self._idle.get(timeout=ACQUIRE_TIMEOUT)
+
+    def _discard(self, conn: sqlite3.Connection):
+        with self._lock:
+            self._created -= 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Empresta uma conexão do pool pelo bloco `with`."""
+        conn = self._acquire()
+        try:
+            yield conn
+        except sqlite3.DatabaseError as e:
+            # Conexão possivelmente inutilizada (ex.: arquivo trocado): não volta ao pool
+            logging.error(f"Erro na conexão de leitura: {e}")
+            self._discard(conn)
+            conn = None
+            raise
+        finally:
+            if conn is not None:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put(conn)
+
+    def close(self):
+        """Fecha as conexões ociosas."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        return {"size": self.size, "created": self._created, "idle": self._idle.qsize()}
@@ -0,0 +1,149 @@
+import logging
+import threading
+from typing import Callable, Optional
+
+from profiling import span
+from scheduler import DEFAULT_MIN_INTERVAL, DEFAULT_MAX_INTERVAL, AdaptiveScheduler
+
+# Espera (s) após um erro inesperado na amostragem antes de tentar de novo
+ERROR_BACKOFF = 5.0
+
+
+class IngestEngine:
+    """
+    Loop de ingestão amostra -> compara -> salva, usado pelo tracker (CLI) e pelo AppOrchestrator.
+
+    A sonda e o relógio vêm do `tracker` (ProductivityTracker); o intervalo entre amostras é do
+    `scheduler`. Se um `writer` (ActivityWriter) for informado, ele é iniciado com o loop, as
+    sessões passam por ele e ele é encerrado (gravando o que estiver pendente) ao final.
+
+    Ganchos opcionais: `on_first_sample()` após a primeira amostra, `on_switch(app, title, start, end)`
+    após cada sessão gravada e `on_tick()` ao fim de cada iteração.
+    """
+
+    def __init__(self, tracker, scheduler: Optional[AdaptiveScheduler] = None, writer=None,
+                 stop_event: Optional[threading.Event] = None,
+                 on_first_sample: Optional[Callable[[], None]] = None,
+                 on_switch: Optional[Callable[[str, str, float, float], None]] = None,
+                 on_tick: Optional[Callable[[], None]] = None):
+        self.tracker = tracker
+        self.clock = tracker.clock
+        self.stop_event = stop_event or threading.Event()
+        self.scheduler = scheduler or AdaptiveScheduler(self.clock, self.stop_event)
+        if self.scheduler.stop_event is None:
+            self.scheduler.stop_event = self.stop_event
+        self.writer = writer
+        self.on_first_sample = on_first_sample
+        self.on_switch = on_switch
+        self.on_tick = on_tick
+
+        # Sessão em aberto
+        self.last_app: Optional[str] = None
+        self.last_title: Optional[str] = None
+        self.session_start = self.clock.time()
+
+        self.samples = 0
+        self.errors = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def with_interval(cls, tracker, interval: float, **kwargs) -> "IngestEngine":
+        """Motor com agendador limitado a `interval` segundos entre amostras com o usuário ativo."""
+        scheduler = AdaptiveScheduler(tracker.clock, min_interval=min(DEFAULT_MIN_INTERVAL, interval),
+                                      max_interval=interval if interval else DEFAULT_MAX_INTERVAL)
+        return cls(tracker, scheduler=scheduler, **kwargs)
+
+    # --- Passos do loop ---
+
+    def poll_once(self) -> bool:
+        """Faz uma amostra; grava a sessão anterior se a janela mudou. Retorna True se mudou."""
+        with span("tracker.poll"):
+            current_app, current_title = self.tracker.get_active_window_info()
+            if self.samples == 0 and self.on_first_sample:
+                self.on_first_sample()
+            self.samples += 1
+
+            changed = current_app != self.last_app or current_title != self.last_title
+            if changed:
+                now = self.clock.time()
+                self._save_session(now)
+                self.session_start = now
+                self.last_app = current_app
+                self.last_title = current_title
+        return changed
+
+    def _save_session(self, end: float):
+        if self.last_app is None:
+            return
+        self.tracker.save_activity(self.last_app, self.last_title, self.session_start, end)
+        if self.on_switch:
+            self.on_switch(self.last_app, self.last_title, self.session_start, end)
+
+    def close_session(self):
+        """Grava a sessão em aberto até agora (usado ao encerrar)."""
+        self._save_session(self.clock.time())
+        self.last_app = None
+        self.last_title = None
+
+    # --- Ciclo de vida ---
+
+    def run(self, max_samples: Optional[int] = None) -> int:
+        """Executa o loop no thread atual até stop() ou `max_samples` amostras. Retorna as amostras."""
+        if self.writer is not None:
+            self.writer.start()
+            self.tracker.writer = self.writer
+        self.session_start = self.clock.time()
+        taken = 0
+
+        try:
+            while not self.stop_event.is_set() and (max_samples is None or taken < max_samples):
+                try:
+                    changed = self.poll_once()
+                    taken += 1
+                    if self.on_tick:
+                        self.on_tick()
+                    self.scheduler.next_interval(changed, self.tracker.get_idle_seconds())
+                    if self.scheduler.wait():
+                        break
+                except (KeyboardInterrupt, SystemExit):
+                    raise
+                except Exception as e:
+                    self.errors += 1
+                    logging.error(f"Erro no loop de ingestão: {e}")
+                    if self.clock.wait(self.stop_event, ERROR_BACKOFF):
+                        break
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close_session()
+            if self.writer is not None:
+                self.writer.close()
+        return taken
+
+    def start(self):
+        """Executa o loop em um thread próprio."""
+        if self._thread and self._thread.is_alive():
+            return
+        self.stop_event.clear()
+        self._thread = threading.Thread(target=self.run, name="IngestEngine", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        """Sinaliza a parada e aguarda a gravação da última sessão."""
+        self.stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Força o commit das sessões já enviadas ao writer (sem fechar a sessão em aberto)."""
+        if self.writer is not None and self.writer.is_running():
+            return self.writer.flush(timeout)
+        return True
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self) -> dict:
+        probe = self.tracker.probe
+        probe_stats = probe.stats() if probe is not None else {}
+        return {"samples": self.samples, "errors": self.errors, **self.scheduler.stats(), **probe_stats}
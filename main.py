@@ -1,19 +1,18 @@
+import time
+
+# Início do processo, referência das fases de inicialização
+PROCESS_START = time.perf_counter()
+
 import sys
 import os
 import threading
 import subprocess
-import time
-import webbrowser
-import shutil
-import win32com.client
-import win32api
-import win32con
-from PIL import Image, ImageDraw
-import pystray
-from pystray import MenuItem as item
-
-# Importar o tracker
-from tracker import ProductivityTracker
+
+# Apenas o mínimo é importado aqui: PIL/pystray, tracker e win32com são carregados
+# sob demanda, para o ícone da bandeja aparecer o quanto antes.
+import profiling
+
+IMPORTS_DONE = time.perf_counter()
 
 # Configurações
 DASHBOARD_PORT = 8501
@@ -21,6 +20,17 @@ DASHBOARD_HOST = "localhost"
 DASHBOARD_URL = f"http://{DASHBOARD_HOST}:{DASHBOARD_PORT}"
 APP_NAME = "TimeTracker Pro"
 
+# Intervalo (s) entre publicações dos tempos do tracker para o painel de diagnóstico
+PROFILE_DUMP_INTERVAL = 60
+
+# O dashboard só sobe ao clicar em "Abrir Dashboard" e se encerra após este tempo (s)
+# sem nenhuma sessão aberta no navegador. Ajustável pela variável de ambiente abaixo (0 desativa).
+DASHBOARD_IDLE_ENV = "TIMETRACKER_DASHBOARD_IDLE"
+DASHBOARD_IDLE_TIMEOUT = int(os.environ.get(DASHBOARD_IDLE_ENV, 15 * 60))
+# Espera máxima (s) pelo servidor do Streamlit antes de abrir o navegador
+DASHBOARD_READY_TIMEOUT = 60
+DASHBOARD_HEALTH_URL = f"{DASHBOARD_URL}/_stcore/health"
+
 def get_resource_path(relative_path):
     """
     Retorna o caminho absoluto do recurso.
@@ -41,20 +51,41 @@ def get_resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 class AppOrchestrator:
-    def __init__(self):
+    def __init__(self, probe=None, clock=None):
+        # Sonda/relógio opcionais (ex.: SyntheticWindowProbe + VirtualClock em execuções headless)
+        self.probe = probe
+        self.clock = clock
         self.tracker_stop_event = threading.Event()
         self.streamlit_process = None
+        self._dashboard_lock = threading.Lock()
         self.icon = None
         self.tracker_thread = None
+        self.writer = None
+        self.engine = None
+        # Fases da inicialização: nome -> segundos desde o início do processo
+        self.startup_phases = {}
+        self._mark_phase("imports", IMPORTS_DONE)
         
         # Registrar handler para interceptar o desligamento do Windows
         try:
+            import win32api
             win32api.SetConsoleCtrlHandler(self._on_shutdown, True)
         except Exception as e:
             print(f"Erro ao registrar handler de shutdown: {e}")
 
+    def _mark_phase(self, name, now=None):
+        """Registra o fim de uma fase da inicialização (também exposto no painel de diagnóstico)."""
+        elapsed = (now if now is not None else time.perf_counter()) - PROCESS_START
+        self.startup_phases[name] = elapsed
+        profiling.TIMINGS.record(f"startup.{name}", elapsed * 1000)
+
+    def startup_report(self):
+        """Resumo das fases de inicialização, em ms desde o início do processo."""
+        return " | ".join(f"{name}: {elapsed * 1000:.0f}ms" for name, elapsed in self.startup_phases.items())
+
     def _on_shutdown(self, sig):
         """Captura sinais de desligamento (Logoff/Shutdown) para limpeza segura."""
+        import win32con
         if sig in [win32con.CTRL_SHUTDOWN_EVENT, win32con.CTRL_LOGOFF_EVENT, win32con.CTRL_CLOSE_EVENT]:
             # Executa limpeza
             self.cleanup()
@@ -64,8 +95,14 @@ class AppOrchestrator:
 
     def cleanup(self):
         """Centraliza a lógica de encerramento."""
-        # 1. Sinaliza para o Tracker parar
+        # 1. Sinaliza para o Tracker parar e aguarda a gravação da última sessão
         self.tracker_stop_event.set()
+        if self.tracker_thread and self.tracker_thread is not threading.current_thread():
+            self.tracker_thread.join(timeout=3)
+
+        # 1.1 Grava as sessões pendentes do writer
+        if self.writer:
+            self.writer.close()
         
         # 2. Para o ícone da bandeja
         if self.icon:
@@ -98,6 +135,7 @@ class AppOrchestrator:
             if getattr(sys, 'frozen', False):
                 target_path = sys.executable
                 if not os.path.exists(shortcut_path):
+                    import win32com.client
                     shell = win32com.client.Dispatch("WScript.Shell")
                     shortcut = shell.CreateShortCut(shortcut_path)
                     shortcut.TargetPath = target_path
@@ -109,36 +147,46 @@ class AppOrchestrator:
 
     def run_tracker(self):
         """Roda o loop do tracker."""
-        tracker = ProductivityTracker()
-        tracker.start_time = time.time()
-        last_app = None
-        last_title = None
+        from tracker import ProductivityTracker
+        from writer import ActivityWriter
+        from ingest import IngestEngine
+        self._mark_phase("tracker_import")
 
-        while not self.tracker_stop_event.is_set():
-            try:
-                current_app, current_title = tracker.get_active_window_info()
-                
-                if current_app != last_app or current_title != last_title:
-                    end_time = time.time()
-                    if last_app is not None:
-                        tracker.save_activity(last_app, last_title, tracker.start_time, end_time)
-                    
-                    tracker.start_time = end_time
-                    last_app = current_app
-                    last_title = current_title
-                
-                # Loop responsivo para saída rápida
-                for _ in range(50):
-                    if self.tracker_stop_event.is_set():
-                        break
-                    time.sleep(0.1)
-                    
-            except Exception as e:
-                print(f"Erro no tracker: {e}")
-                time.sleep(5)
-
-        if last_app:
-            tracker.save_activity(last_app, last_title, tracker.start_time, time.time())
+        tracker = ProductivityTracker(probe=self.probe, clock=self.clock)
+        self._mark_phase("db_init")
+        self.writer = ActivityWriter(tracker.db_path)
+        last_dump = [time.monotonic()]
+
+        def on_first_sample():
+            self._mark_phase("first_sample")
+            print(f"Inicialização: {self.startup_report()}")
+
+        def on_tick():
+            if time.monotonic() - last_dump[0] >= PROFILE_DUMP_INTERVAL:
+                self.dump_profile()
+                last_dump[0] = time.monotonic()
+
+        # O motor grava a última sessão e encerra o writer ao parar (tracker_stop_event)
+        self.engine = IngestEngine(
+            tracker,
+            writer=self.writer,
+            stop_event=self.tracker_stop_event,
+            on_first_sample=on_first_sample,
+            on_tick=on_tick
+        )
+        self.engine.run()
+        print(f"Ingestão: {self.engine.stats()}")
+        self.dump_profile()
+
+    def dump_profile(self):
+        """Publica os tempos do tracker para o painel de diagnóstico do dashboard."""
+        if self.engine is not None:
+            for name, value in self.engine.stats().items():
+                profiling.set_gauge(f"ingest.{name}", value)
+        try:
+            profiling.dump_json(profiling.TRACKER_PROFILE_FILE)
+        except OSError as e:
+            print(f"Erro ao gravar diagnóstico: {e}")
 
     def run_streamlit(self):
         """Prepara e executa o Streamlit."""
@@ -158,10 +206,53 @@ class AppOrchestrator:
         if os.name == 'nt':
             kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
 
+        # O próprio dashboard encerra o processo quando fica ocioso (ver dashboard.start_idle_watchdog)
+        env = dict(os.environ, **{DASHBOARD_IDLE_ENV: str(DASHBOARD_IDLE_TIMEOUT)})
+
         # close_fds=True evita que o filho herde handles de arquivos abertos (importante para evitar travas)
-        self.streamlit_process = subprocess.Popen(cmd, close_fds=True, **kwargs)
+        self.streamlit_process = subprocess.Popen(cmd, close_fds=True, env=env, **kwargs)
+
+    def dashboard_running(self):
+        return self.streamlit_process is not None and self.streamlit_process.poll() is None
+
+    def wait_dashboard_ready(self, timeout=DASHBOARD_READY_TIMEOUT):
+        """Consulta o endpoint de saúde do Streamlit até responder (ou o processo morrer)."""
+        import urllib.request
+        import urllib.error
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not self.dashboard_running():
+                return False
+            try:
+                with urllib.request.urlopen(DASHBOARD_HEALTH_URL, timeout=1) as response:
+                    if response.status == 200:
+                        return True
+            except (urllib.error.URLError, OSError):
+                pass
+            time.sleep(0.25)
+        return False
+
+    def ensure_dashboard(self):
+        """Sobe o Streamlit se não estiver rodando (ou se encerrou por ociosidade) e aguarda ficar pronto."""
+        with self._dashboard_lock:
+            if not self.dashboard_running():
+                started = time.perf_counter()
+                self.run_streamlit()
+                ready = self.wait_dashboard_ready()
+                profiling.TIMINGS.record("dashboard.spawn_to_ready", (time.perf_counter() - started) * 1000)
+                return ready
+            return self.wait_dashboard_ready()
+
+    def _open_dashboard_when_ready(self):
+        import webbrowser
+        if self.ensure_dashboard():
+            webbrowser.open(DASHBOARD_URL)
+        else:
+            print("Erro: o dashboard não respondeu a tempo.")
 
     def create_image(self):
+        from PIL import Image, ImageDraw
         width = 64
         height = 64
         color1 = (0, 128, 255)
@@ -173,7 +264,8 @@ class AppOrchestrator:
         return image
 
     def open_dashboard(self, icon, item):
-        webbrowser.open(DASHBOARD_URL)
+        # Não bloqueia o menu da bandeja enquanto o Streamlit sobe
+        threading.Thread(target=self._open_dashboard_when_ready, daemon=True).start()
 
     def quit_app(self, icon, item):
         self.cleanup()
@@ -181,13 +273,20 @@ class AppOrchestrator:
             self.icon.stop()
         sys.exit(0)
 
-    def start(self):
-        self.create_startup_shortcut()
-        
+    def _on_tray_ready(self, icon):
+        """Executado pelo pystray assim que o loop da bandeja inicia (em thread própria)."""
+        icon.visible = True
+        self._mark_phase("tray")
+
+        # Só a amostragem fica residente; o Streamlit sobe sob demanda (open_dashboard)
         self.tracker_thread = threading.Thread(target=self.run_tracker, daemon=True)
         self.tracker_thread.start()
 
-        self.run_streamlit()
+        self.create_startup_shortcut()
+
+    def start(self):
+        import pystray
+        from pystray import MenuItem as item
 
         image = self.create_image()
         menu = (
@@ -195,11 +294,12 @@ class AppOrchestrator:
             item('Sair', self.quit_app)
         )
         self.icon = pystray.Icon("TimeTracker", image, "Time Tracker", menu)
-        self.icon.run()
+        self.icon.run(setup=self._on_tray_ready)
 
 if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == "--dashboard":
         try:
+            import shutil
             from streamlit.web import cli as stcli
             
             dashboard_path = get_resource_path("dashboard.py")
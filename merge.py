@@ -0,0 +1,420 @@
+import os
+import sqlite3
+import time
+import datetime
+import logging
+import tempfile
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import archive
+from category_rules import UNCATEGORIZED
+from compaction import COMPACTION_LOG_DDL
+from db_pool import connect_read_only
+from tracker import DB_NAME, DimensionInterner, ProductivityTracker, ensure_device_id
+
+# Progresso por banco de origem: maior activity_log.id já importado (high-water mark)
+MERGE_SOURCES_DDL = """
+    CREATE TABLE IF NOT EXISTS merge_sources (
+        source_id TEXT PRIMARY KEY,
+        last_id INTEGER NOT NULL DEFAULT 0,
+        rows_merged INTEGER NOT NULL DEFAULT 0,
+        merged_at INTEGER NOT NULL
+    )
+"""
+
+# Mesma tabela criada pelo dashboard (diário por dia)
+JOURNAL_DDL = """
+    CREATE TABLE IF NOT EXISTS journal_entries (
+        entry_date TEXT PRIMARY KEY,
+        content TEXT
+    )
+"""
+
+# Separador entre textos de dispositivos diferentes no mesmo dia do diário
+JOURNAL_SEPARATOR = "\n\n---\n\n"
+
+# Pares (app, título) da origem mapeados para os ids do destino; título NULL vira -1 na chave
+MERGE_PAIRS_DDL = """
+    CREATE TEMP TABLE merge_pairs (
+        src_app_id INTEGER NOT NULL,
+        src_title_key INTEGER NOT NULL,
+        app_id INTEGER NOT NULL,
+        title_id INTEGER,
+        category_id INTEGER,
+        PRIMARY KEY (src_app_id, src_title_key)
+    )
+"""
+
+# Meses que o destino já moveu para o arquivo morto (Parquet), em epoch ms [início, fim)
+MERGE_ARCHIVED_DDL = """
+    CREATE TEMP TABLE merge_archived (
+        start_ms INTEGER NOT NULL,
+        end_ms INTEGER NOT NULL
+    )
+"""
+
+# Linha da origem que cai em um mês arquivado do destino
+_IN_ARCHIVED_MONTH = """
+    EXISTS (SELECT 1 FROM temp.merge_archived m WHERE s.start_time >= m.start_ms AND s.start_time < m.end_ms)
+"""
+
+
+@dataclass
+class MergeResult:
+    """Resumo de uma importação."""
+    source_id: str
+    last_id: int = 0
+    rows_read: int = 0
+    rows_inserted: int = 0
+    rows_archived: int = 0
+    app_settings: int = 0
+    journal_entries: int = 0
+    days: List[str] = field(default_factory=list)
+    # Partes Parquet a gravar no commit: mês -> linhas na ordem de archive.ARCHIVE_COLUMNS
+    archive_parts: Dict[str, List[tuple]] = field(default_factory=dict)
+
+    @property
+    def duplicates(self) -> int:
+        return self.rows_read - self.rows_inserted - self.rows_archived
+
+
+def _has_table(cursor, schema: str, table: str) -> bool:
+    cursor.execute(f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return cursor.fetchone() is not None
+
+def _map_pairs(cursor, last_id: int) -> int:
+    """
+    Preenche temp.merge_pairs com os pares (app, título) das linhas novas da origem.
+    Nomes e títulos entram nas dimensões do destino (título limpo e categoria pelas regras
+    do destino), uma vez por par distinto.
+    """
+    cursor.execute(MERGE_PAIRS_DDL)
+    cursor.execute("""
+        SELECT p.app_id, p.title_id, a.name, t.title
+        FROM (SELECT DISTINCT app_id, title_id FROM src.activity_log WHERE id > ?) p
+        JOIN src.apps a ON a.id = p.app_id
+        LEFT JOIN src.window_titles t ON t.id = p.title_id
+    """, (last_id,))
+    pairs = cursor.fetchall()
+
+    interner = DimensionInterner()
+    interner.refresh_title_rules(cursor)
+    interner.refresh_category_rules(cursor)
+    rows = []
+    for src_app_id, src_title_id, app_name, window_title in pairs:
+        category_id, _ = interner.categorize(cursor, app_name, window_title)
+        rows.append((
+            src_app_id,
+            -1 if src_title_id is None else src_title_id,
+            interner.intern(cursor, "apps", app_name),
+            interner.intern(cursor, "window_titles", window_title),
+            category_id,
+        ))
+    cursor.executemany("INSERT INTO temp.merge_pairs VALUES (?, ?, ?, ?, ?)", rows)
+    return len(rows)
+
+def _allocate_ids(cursor, count: int) -> int:
+    """Reserva `count` ids do AUTOINCREMENT do activity_log; retorna o primeiro."""
+    cursor.execute("SELECT seq FROM main.sqlite_sequence WHERE name = 'activity_log'")
+    row = cursor.fetchone()
+    if row is None:
+        cursor.execute("INSERT INTO main.sqlite_sequence (name, seq) VALUES ('activity_log', ?)", (count,))
+        return 1
+    cursor.execute("UPDATE main.sqlite_sequence SET seq = ? WHERE name = 'activity_log'", (row[0] + count,))
+    return row[0] + 1
+
+def _merge_archived(cursor, result: MergeResult, last_id: int, archive_dir: str):
+    """
+    Linhas da origem em meses que o destino já arquivou vão para uma parte Parquet nova do mês
+    (gravada só no commit, em merge_database), deduplicadas pelo conteúdo contra o arquivo.
+    O rollup desses dias recebe a soma; eles não têm registros brutos para recalcular.
+    """
+    cursor.execute(f"""
+        SELECT a.name, t.title, t.clean_title, s.start_time, s.end_time, s.duration_seconds, c.name
+        FROM src.activity_log s
+        JOIN temp.merge_pairs p ON p.src_app_id = s.app_id AND p.src_title_key = COALESCE(s.title_id, -1)
+        JOIN main.apps a ON a.id = p.app_id
+        LEFT JOIN main.window_titles t ON t.id = p.title_id
+        LEFT JOIN main.categories c ON c.id = p.category_id
+        WHERE s.id > ? AND {_IN_ARCHIVED_MONTH}
+        ORDER BY s.start_time, s.id
+    """, (last_id,))
+    by_month: Dict[str, List[tuple]] = {}
+    for row in cursor.fetchall():
+        month = datetime.datetime.fromtimestamp(row[3] / 1000).strftime("%Y-%m")
+        by_month.setdefault(month, []).append(row)
+
+    hourly: Dict[tuple, List[float]] = {}
+    for month, rows in by_month.items():
+        seen = archive.archived_session_keys(archive_dir, month)
+        fresh = []
+        for row in rows:
+            key = (row[0], row[1], row[3], row[4])
+            if key not in seen:
+                seen.add(key)
+                fresh.append(row)
+        if not fresh:
+            continue
+
+        first_id = _allocate_ids(cursor, len(fresh))
+        result.archive_parts[month] = [
+            (first_id + i, app_name, title, clean_title, start, end, duration)
+            for i, (app_name, title, clean_title, start, end, duration, _) in enumerate(fresh)
+        ]
+        result.rows_archived += len(fresh)
+        for app_name, _, _, start, _, duration, category in fresh:
+            local_start = datetime.datetime.fromtimestamp(start / 1000)
+            key = (local_start.strftime("%Y-%m-%d"), local_start.hour, app_name, category or UNCATEGORIZED)
+            totals = hourly.setdefault(key, [0.0, 0])
+            totals[0] += duration or 0.0
+            totals[1] += 1
+
+    cursor.executemany("""
+        INSERT INTO main.activity_hourly (day, hour, app_name, category, duration_seconds, sessions)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (day, hour, app_name, category) DO UPDATE SET
+            duration_seconds = duration_seconds + excluded.duration_seconds,
+            sessions = sessions + excluded.sessions
+    """, [(*key, duration, sessions) for key, (duration, sessions) in hourly.items()])
+
+def _merge_activity(cursor, result: MergeResult, last_id: int, archive_dir: str):
+    """Copia as linhas novas da origem, sem duplicar sessões que o destino já tem."""
+    cursor.execute("SELECT COUNT(*), MAX(id) FROM src.activity_log WHERE id > ?", (last_id,))
+    result.rows_read, max_id = cursor.fetchone()
+    result.last_id = max_id or last_id
+    if not result.rows_read:
+        return
+
+    _map_pairs(cursor, last_id)
+    cursor.execute(MERGE_ARCHIVED_DDL)
+    cursor.executemany(
+        "INSERT INTO temp.merge_archived VALUES (?, ?)",
+        [archive.month_bounds_ms(month) for month in archive.archived_months(archive_dir)]
+    )
+    _merge_archived(cursor, result, last_id, archive_dir)
+
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM main.activity_log")
+    first_new_id = cursor.fetchone()[0]
+
+    # Deduplicação determinística pelo conteúdo: mesma sessão = mesmo app, título, início e fim.
+    # O fim entra na chave porque as linhas divididas na virada de hora começam no mesmo instante
+    # em todos os dispositivos. Usa idx_activity_start no destino.
+    cursor.execute(f"""
+        INSERT INTO main.activity_log (app_id, title_id, start_time, end_time, duration_seconds, category_id)
+        SELECT p.app_id, p.title_id, s.start_time, s.end_time, s.duration_seconds, p.category_id
+        FROM src.activity_log s
+        JOIN temp.merge_pairs p ON p.src_app_id = s.app_id AND p.src_title_key = COALESCE(s.title_id, -1)
+        WHERE s.id > ? AND NOT {_IN_ARCHIVED_MONTH}
+          AND NOT EXISTS (
+              SELECT 1 FROM main.activity_log t
+              WHERE t.start_time = s.start_time AND t.end_time IS s.end_time
+                AND t.app_id = p.app_id AND t.title_id IS p.title_id
+          )
+        ORDER BY s.start_time, s.id
+    """, (last_id,))
+    result.rows_inserted = cursor.rowcount
+    cursor.execute("DROP TABLE temp.merge_pairs")
+    cursor.execute("DROP TABLE temp.merge_archived")
+    if not result.rows_inserted:
+        return
+
+    # Rollup por hora: soma incremental das linhas importadas (mesmo cálculo de rebuild_hourly_rollup)
+    local_start = "datetime(start_time / 1000, 'unixepoch', 'localtime')"
+    cursor.execute(f"""
+        INSERT INTO main.activity_hourly (day, hour, app_name, category, duration_seconds, sessions)
+        SELECT date({local_start}),
+               CAST(strftime('%H', {local_start}) AS INTEGER),
+               app_name,
+               category,
+               SUM(duration_seconds),
+               COUNT(*)
+        FROM main.activity_sessions
+        WHERE id > ?
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (day, hour, app_name, category) DO UPDATE SET
+            duration_seconds = duration_seconds + excluded.duration_seconds,
+            sessions = sessions + excluded.sessions
+    """, (first_new_id,))
+
+    # Dias que receberam linhas voltam para a fila da compactação
+    cursor.execute(f"""
+        SELECT DISTINCT date({local_start}) FROM main.activity_log WHERE id > ? ORDER BY 1
+    """, (first_new_id,))
+    result.days = [row[0] for row in cursor.fetchall()]
+    cursor.execute(COMPACTION_LOG_DDL)
+    cursor.executemany("DELETE FROM main.compaction_log WHERE day = ?", [(day,) for day in result.days])
+
+def _merge_app_settings(cursor, result: MergeResult):
+    """Configurações de apps que o destino ainda não tem (as do destino prevalecem)."""
+    cursor.execute("""
+        INSERT OR IGNORE INTO main.app_settings (app_name, display_name, hex_color, category)
+        SELECT app_name, display_name, hex_color, category FROM src.app_settings
+    """)
+    result.app_settings = cursor.rowcount
+
+def _merge_journal(cursor, result: MergeResult):
+    """
+    Diário: dias novos são copiados; no mesmo dia com textos diferentes, o texto da origem é
+    anexado (uma única vez, então repetir o merge não duplica).
+    """
+    if not _has_table(cursor, "src", "journal_entries"):
+        return
+    cursor.execute(JOURNAL_DDL)
+    cursor.execute("""
+        UPDATE main.journal_entries
+        SET content = (
+            SELECT CASE WHEN TRIM(COALESCE(main.journal_entries.content, '')) = '' THEN s.content
+                        ELSE main.journal_entries.content || ? || s.content END
+            FROM src.journal_entries s
+            WHERE s.entry_date = main.journal_entries.entry_date
+        )
+        WHERE entry_date IN (
+            SELECT s.entry_date FROM src.journal_entries s
+            JOIN main.journal_entries m ON m.entry_date = s.entry_date
+            WHERE TRIM(COALESCE(s.content, '')) != ''
+              AND instr(COALESCE(m.content, ''), s.content) = 0
+        )
+    """, (JOURNAL_SEPARATOR,))
+    updated = cursor.rowcount
+    cursor.execute("""
+        INSERT OR IGNORE INTO main.journal_entries (entry_date, content)
+        SELECT entry_date, content FROM src.journal_entries
+    """)
+    result.journal_entries = updated + cursor.rowcount
+
+def _read_device_id(source_path: str) -> Optional[str]:
+    """device_id gravado na origem (None se ela é de uma versão sem device_info)."""
+    conn = connect_read_only(source_path)
+    try:
+        cursor = conn.cursor()
+        if not _has_table(cursor, "main", "device_info"):
+            return None
+        cursor.execute("SELECT device_id FROM device_info LIMIT 1")
+        row = cursor.fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+def _snapshot_database(source_path: str, copy_path: str):
+    """Copia a origem (pela API de backup, lida em modo somente leitura) para `copy_path`."""
+    source = connect_read_only(source_path)
+    try:
+        copy = sqlite3.connect(copy_path)
+        try:
+            source.backup(copy)
+        finally:
+            copy.close()
+    finally:
+        source.close()
+
+def merge_database(source_path: str, db_path: str = DB_NAME, source_id: Optional[str] = None,
+                   archive_dir: Optional[str] = None) -> MergeResult:
+    """
+    Importa em `db_path` o activity_log, o app_settings e o journal_entries de outro banco.
+
+    A origem não é alterada: ela é copiada para um arquivo temporário, que recebe as migrações
+    de esquema e é anexado (ATTACH). Tudo roda em uma única transação, inclusive o avanço do
+    high-water mark em merge_sources: uma falha não deixa importação parcial, e repetir o
+    merge copia só as linhas com id acima do último importado daquela origem. A origem é
+    identificada pelo device_info (ou por `source_id`; sem nenhum dos dois, pelo caminho).
+    Sessões em meses já arquivados no destino vão para o arquivo morto (`archive_dir`).
+    """
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(source_path)
+    if os.path.abspath(source_path) == os.path.abspath(db_path):
+        raise ValueError("A origem e o destino são o mesmo arquivo.")
+    archive_dir = archive_dir or archive.default_archive_dir(db_path)
+    source_id = source_id or _read_device_id(source_path) or f"arquivo:{os.path.abspath(source_path)}"
+
+    ProductivityTracker(db_path)
+    with tempfile.TemporaryDirectory(prefix="merge-") as tmp_dir:
+        # Esquema atual na cópia da origem
+        copy_path = os.path.join(tmp_dir, "source.db")
+        _snapshot_database(source_path, copy_path)
+        ProductivityTracker(copy_path)
+        result = _merge_copy(copy_path, db_path, source_id, archive_dir)
+
+    logging.info(
+        f"Merge de {source_path} ({source_id}): {result.rows_inserted} de {result.rows_read} registros "
+        f"importados e {result.rows_archived} arquivados ({result.duplicates} duplicados), "
+        f"{len(result.days)} dias, {result.app_settings} apps configurados, "
+        f"{result.journal_entries} entradas do diário"
+    )
+    return result
+
+def _merge_copy(copy_path: str, db_path: str, source_id: str, archive_dir: str) -> MergeResult:
+    """Transação do merge sobre a cópia migrada da origem."""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    written: List[str] = []
+    try:
+        cursor = conn.cursor()
+        cursor.execute("ATTACH DATABASE ? AS src", (copy_path,))
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            if source_id == ensure_device_id(cursor, "main"):
+                raise ValueError(
+                    "A origem tem o mesmo device_id do destino (cópia do mesmo banco?). "
+                    "Informe --source-id para importá-la mesmo assim."
+                )
+
+            cursor.execute(MERGE_SOURCES_DDL)
+            cursor.execute("SELECT last_id FROM merge_sources WHERE source_id = ?", (source_id,))
+            row = cursor.fetchone()
+            last_id = row[0] if row else 0
+
+            result = MergeResult(source_id=source_id, last_id=last_id)
+            # Configurações antes das sessões: a categoria manual dos apps é o fallback das regras
+            _merge_app_settings(cursor, result)
+            _merge_activity(cursor, result, last_id, archive_dir)
+            _merge_journal(cursor, result)
+
+            cursor.execute("""
+                INSERT INTO merge_sources (source_id, last_id, rows_merged, merged_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (source_id) DO UPDATE SET
+                    last_id = excluded.last_id,
+                    rows_merged = rows_merged + excluded.rows_merged,
+                    merged_at = excluded.merged_at
+            """, (source_id, result.last_id, result.rows_inserted + result.rows_archived,
+                  int(time.time() * 1000)))
+
+            # Parquet por último: se a gravação ou o commit falhar, as partes novas são removidas
+            for month, rows in result.archive_parts.items():
+                written.append(archive.write_month_part(archive_dir, month, rows))
+            cursor.execute("COMMIT")
+        except BaseException:
+            cursor.execute("ROLLBACK")
+            for path in written:
+                os.remove(path)
+            raise
+        cursor.execute("DETACH DATABASE src")
+    finally:
+        conn.close()
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Importa os dados de outro banco (ex.: de outro computador)")
+    parser.add_argument("source", nargs="+", help="Banco(s) SQLite de origem")
+    parser.add_argument("--db", default=DB_NAME, help="Banco SQLite de destino")
+    parser.add_argument("--source-id", default=None,
+                        help="Identificador da origem, só com um banco de origem "
+                             "(padrão: device_info do banco de origem)")
+    parser.add_argument("--archive-dir", default=None,
+                        help="Diretório do arquivo morto do destino (padrão: ./archive)")
+    args = parser.parse_args()
+    # Cada origem tem seu próprio high-water mark em merge_sources: um id não pode valer para várias
+    if args.source_id and len(args.source) > 1:
+        parser.error("--source-id só pode ser usado com um único banco de origem")
+
+    failed = False
+    for path in args.source:
+        try:
+            merge_database(path, args.db, args.source_id, args.archive_dir)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            logging.error(f"Erro no merge de {path}: {e}")
+            failed = True
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,283 @@
+import os
+import time
+import random
+import sqlite3
+import logging
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+# Amostra devolvida pelas sondas: (nome do executável, título da janela)
+WindowSample = Tuple[Optional[str], Optional[str]]
+
+# Apps usados pela sonda sintética quando nenhum roteiro é informado
+DEFAULT_SYNTHETIC_APPS = {
+    "opera.exe": [
+        "YouTube - Opera",
+        "GitHub - Opera",
+        "Stack Overflow - Opera",
+        "Gmail - Opera",
+    ],
+    "Code.exe": [
+        "tracker.py - TimeTracker - Visual Studio Code",
+        "dashboard.py - TimeTracker - Visual Studio Code",
+    ],
+    "WindowsTerminal.exe": ["Windows PowerShell"],
+    "explorer.exe": ["Downloads", "Documentos"],
+    "Discord.exe": ["#geral - Discord"],
+}
+
+# Início padrão do relógio virtual (2024-01-01 00:00 UTC): execuções sintéticas repetidas cortam
+# as sessões nas mesmas viradas de hora e geram as mesmas contagens
+SYNTHETIC_START_EPOCH = 1704067200.0
+
+
+class SystemClock:
+    """Relógio real (time.time / time.sleep)."""
+
+    def time(self) -> float:
+        return time.time()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+    def wait(self, event, seconds: float) -> bool:
+        """Aguarda até `seconds` ou até o evento ser sinalizado; retorna True se sinalizado."""
+        if event is None:
+            time.sleep(seconds)
+            return False
+        return event.wait(seconds)
+
+
+class VirtualClock:
+    """
+    Relógio simulado: sleep() apenas avança o tempo, sem bloquear.
+    Começa em SYNTHETIC_START_EPOCH; para partir do horário atual, passe start=time.time().
+    """
+
+    def __init__(self, start: float = SYNTHETIC_START_EPOCH):
+        self._now = float(start)
+
+    def time(self) -> float:
+        return self._now
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            self._now += seconds
+
+    advance = sleep
+
+    def wait(self, event, seconds: float) -> bool:
+        self.sleep(seconds)
+        return event is not None and event.is_set()
+
+
+class ProcessNameCache:
+    """
+    Cache LRU limitado de nomes de executável por (pid, hora de criação do processo).
+    A hora de criação diferencia um PID reaproveitado por outro processo.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._names: "OrderedDict[Hashable, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[str]:
+        name = self._names.get(key)
+        if name is None:
+            self.misses += 1
+            return None
+        self._names.move_to_end(key)
+        self.hits += 1
+        return name
+
+    def put(self, key: Hashable, name: str):
+        self._names[key] = name
+        self._names.move_to_end(key)
+        if len(self._names) > self.max_entries:
+            self._names.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+class WindowProbe:
+    """Interface das fontes de janela ativa usadas pelo tracker."""
+
+    def sample(self) -> WindowSample:
+        """Retorna (app_name, window_title) da janela em foco, ou (None, None)."""
+        raise NotImplementedError
+
+    def idle_seconds(self) -> Optional[float]:
+        """Segundos desde a última entrada do usuário (teclado/mouse); None se não suportado."""
+        return None
+
+    def stats(self) -> dict:
+        """Contadores internos da sonda (para diagnóstico)."""
+        return {}
+
+
+class Win32WindowProbe(WindowProbe):
+    """
+    Sonda real baseada em win32gui/win32process (somente Windows).
+
+    O nome do executável é resolvido só quando a janela em foco muda: para a mesma
+    (hwnd, pid) da amostra anterior, reaproveita o nome sem abrir o processo. Nas demais,
+    o cache por (pid, hora de criação) evita o GetModuleFileNameEx.
+    """
+
+    PROTECTED_APP = "System/Protected"
+
+    def __init__(self, cache_size: int = 256):
+        # Imports locais: permitem importar o tracker em máquinas sem pywin32
+        import win32gui
+        import win32process
+        import win32api
+        import win32con
+        self._win32gui = win32gui
+        self._win32process = win32process
+        self._win32api = win32api
+        self._win32con = win32con
+        self.names = ProcessNameCache(cache_size)
+        # (hwnd, pid, app_name) da última amostra
+        self._last_window: Tuple[int, int, Optional[str]] = (0, 0, None)
+        self.same_window_hits = 0
+
+    def _resolve_app_name(self, pid: int) -> str:
+        """Nome do executável de `pid`, consultando o cache por (pid, hora de criação)."""
+        try:
+            handle = self._win32api.OpenProcess(
+                self._win32con.PROCESS_QUERY_INFORMATION | self._win32con.PROCESS_VM_READ,
+                False,
+                pid
+            )
+        except Exception:
+            return self.PROTECTED_APP
+
+        try:
+            created = self._win32process.GetProcessTimes(handle)["CreationTime"]
+            key = (pid, str(created))
+            app_name = self.names.get(key)
+            if app_name is None:
+                exe_path = self._win32process.GetModuleFileNameEx(handle, 0)
+                app_name = os.path.basename(exe_path)
+                self.names.put(key, app_name)
+            return app_name
+        except Exception:
+            return self.PROTECTED_APP
+        finally:
+            self._win32api.CloseHandle(handle)
+
+    def sample(self) -> WindowSample:
+        """Captura o nome do executável e o título da janela ativa."""
+        try:
+            hwnd = self._win32gui.GetForegroundWindow()
+            if not hwnd:
+                return None, None
+
+            _, pid = self._win32process.GetWindowThreadProcessId(hwnd)
+
+            last_hwnd, last_pid, last_app = self._last_window
+            if hwnd == last_hwnd and pid == last_pid:
+                app_name = last_app
+                self.same_window_hits += 1
+            else:
+                app_name = self._resolve_app_name(pid)
+                self._last_window = (hwnd, pid, app_name)
+
+            window_title = self._win32gui.GetWindowText(hwnd)
+            return app_name, window_title
+
+        except Exception as e:
+            logging.error(f"Erro ao capturar janela: {e}")
+            return None, None
+
+    def idle_seconds(self) -> Optional[float]:
+        try:
+            # Contadores de 32 bits em ms (dão a volta a cada ~49 dias)
+            elapsed_ms = (self._win32api.GetTickCount() - self._win32api.GetLastInputInfo()) & 0xFFFFFFFF
+            return elapsed_ms / 1000.0
+        except Exception:
+            return None
+
+    def stats(self) -> dict:
+        return {
+            "same_window_hits": self.same_window_hits,
+            "name_cache_hits": self.names.hits,
+            "name_cache_misses": self.names.misses,
+            "name_cache_entries": len(self.names),
+        }
+
+
+class SyntheticWindowProbe(WindowProbe):
+    """
+    Sonda determinística para execuções headless (testes e benchmarks).
+
+    Modo roteiro: `script` é uma sequência de (app, título, segundos) tocada em ordem.
+    Modo aleatório: sem roteiro, sorteia app/título de `apps` com permanência
+    exponencial de média `mean_dwell` segundos, a partir de `seed`.
+    O tempo vem de `clock` (normalmente um VirtualClock).
+    """
+
+    def __init__(self, clock, script: Optional[Sequence[Tuple[str, str, float]]] = None,
+                 apps: Optional[Dict[str, List[str]]] = None, seed: int = 0,
+                 mean_dwell: float = 30.0, loop: bool = True):
+        self.clock = clock
+        self.script = list(script) if script else None
+        self.apps = apps or DEFAULT_SYNTHETIC_APPS
+        self.mean_dwell = mean_dwell
+        self.loop = loop
+        self._rng = random.Random(seed)
+        self._app_names = sorted(self.apps)
+        self._position = -1
+        self._current: WindowSample = (None, None)
+        self._switch_at = self.clock.time()
+        self.switches = 0
+
+    @classmethod
+    def from_database(cls, clock, db_path: str, limit: Optional[int] = None, loop: bool = False):
+        """Cria um roteiro de replay a partir do activity_log de um banco existente."""
+        conn = sqlite3.connect(db_path)
+        try:
+            query = """
+                SELECT app_name, window_title, duration_seconds
+                FROM activity_sessions
+                ORDER BY start_time
+            """
+            params: Tuple = ()
+            if limit:
+                query += " LIMIT ?"
+                params = (limit,)
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+        script = [(app, title or "", duration or 0.0) for app, title, duration in rows]
+        return cls(clock, script=script, loop=loop)
+
+    def _next_scripted(self) -> Tuple[WindowSample, float]:
+        self._position += 1
+        if self._position >= len(self.script):
+            if not self.loop:
+                # Fim do roteiro: nenhuma janela em foco daqui para frente
+                return (None, None), float("inf")
+            self._position = 0
+        app, title, seconds = self.script[self._position]
+        return (app, title), max(float(seconds), 0.001)
+
+    def _next_random(self) -> Tuple[WindowSample, float]:
+        app = self._rng.choice(self._app_names)
+        title = self._rng.choice(self.apps[app])
+        return (app, title), self._rng.expovariate(1.0 / self.mean_dwell)
+
+    def sample(self) -> WindowSample:
+        now = self.clock.time()
+        while now >= self._switch_at:
+            if self.script:
+                self._current, dwell = self._next_scripted()
+            else:
+                self._current, dwell = self._next_random()
+            self._switch_at += dwell
+            self.switches += 1
+        return self._current
+
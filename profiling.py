@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Optional
+
+# Limites superiores (ms) das faixas do histograma; a última faixa é "acima de 5000ms"
+HISTOGRAM_BOUNDS_MS = [1, 5, 10, 50, 100, 500, 1000, 5000]
+
+# Variável de ambiente que exibe o painel de diagnóstico do dashboard (também: ?debug=1 na URL)
+DEBUG_ENV = "TIMETRACKER_DEBUG"
+
+# Arquivo em que o processo do tracker publica seus tempos (lido pelo painel do dashboard)
+TRACKER_PROFILE_FILE = "diagnostics_tracker.json"
+
+
+class SpanStats:
+    """Contadores e histograma de um span."""
+
+    __slots__ = ("count", "total_ms", "min_ms", "max_ms", "last_ms", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = float("inf")
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+
+    def add(self, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.last_ms = elapsed_ms
+        if elapsed_ms < self.min_ms:
+            self.min_ms = elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+        for index, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+            if elapsed_ms <= bound:
+                self.buckets[index] += 1
+                return
+        self.buckets[-1] += 1
+
+    def to_dict(self) -> dict:
+        labels = [f"<={bound}ms" for bound in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}ms"]
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "min_ms": round(self.min_ms, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "last_ms": round(self.last_ms, 3),
+            "histogram": dict(zip(labels, self.buckets)),
+        }
+
+
+class Timings:
+    """
+    Registro de tempos por nome de span (thread-safe). O custo por span é um par de
+    perf_counter e um lock, então os spans podem ficar sempre ativos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans: Dict[str, SpanStats] = {}
+        # Valores instantâneos (ex.: acordadas por segundo do agendador)
+        self._gauges: Dict[str, float] = {}
+        self.started_at = time.time()
+
+    def record(self, name: str, elapsed_ms: float):
+        with self._lock:
+            stats = self._spans.get(name)
+            if stats is None:
+                stats = self._spans[name] = SpanStats()
+            stats.add(elapsed_ms)
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self._gauges[name] = value
+
+    @contextmanager
+    def span(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - started) * 1000)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            spans = {name: stats.to_dict() for name, stats in sorted(self._spans.items())}
+            gauges = dict(sorted(self._gauges.items()))
+        return {
+            "pid": os.getpid(),
+            "started_at": self.started_at,
+            "captured_at": time.time(),
+            "spans": spans,
+            "gauges": gauges,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._gauges.clear()
+        self.started_at = time.time()
+
+
+# Registro do processo
+TIMINGS = Timings()
+
+
+def span(name: str):
+    """Context manager que mede um bloco no registro do processo."""
+    return TIMINGS.span(name)
+
+def timed(name: Optional[str] = None):
+    """Decorador equivalente a span() em torno da função."""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with TIMINGS.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def set_gauge(name: str, value: float):
+    TIMINGS.set_gauge(name, value)
+
+def snapshot() -> dict:
+    return TIMINGS.snapshot()
+
+def to_json(data: Optional[dict] = None) -> str:
+    return json.dumps(data if data is not None else snapshot(), indent=2, ensure_ascii=False)
+
+def dump_json(path: str):
+    """Grava o snapshot atual em `path` (troca atômica, para leitores concorrentes)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(to_json())
+    os.replace(tmp_path, path)
+
+def load_json(path: str) -> Optional[dict]:
+    """Lê um snapshot gravado por dump_json (None se não existir ou estiver inválido)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def debug_enabled() -> bool:
+    return os.environ.get(DEBUG_ENV, "") not in ("", "0")
@@ -0,0 +1,355 @@
+import datetime
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from dateutil import tz
+
+import archive
+from category_rules import UNCATEGORIZED, CategoryMatcher
+from profiling import span
+from title_rules import clean_titles
+from tracker import day_bounds_ms, load_app_categories, load_category_rules
+
+# Fuso local (com horário de verão) usado para exibir os timestamps gravados em UTC/epoch
+LOCAL_TZ = tz.tzlocal()
+
+# Consultas de leitura do dashboard, sem dependência do Streamlit (usadas também pelo benchmark).
+# Todas recebem uma conexão aberta; o tratamento de erros fica com quem chama.
+# O SQL fica em constantes para que query_plan_checks confira o plano das mesmas consultas.
+
+AVAILABLE_DATES_SQL = "SELECT DISTINCT day FROM activity_hourly ORDER BY day DESC"
+
+# Sessões do dia por faixa de start_time (usa idx_activity_start)
+DAY_SESSIONS_SQL = """
+    SELECT l.*,
+           COALESCE(s.display_name, l.app_name) as display_name,
+           s.hex_color
+    FROM activity_sessions l
+    LEFT JOIN app_settings s ON l.app_name = s.app_name
+    WHERE l.start_time >= ? AND l.start_time < ?
+"""
+
+COUNT_DAY_ROWS_SQL = "SELECT COUNT(*) FROM activity_log WHERE start_time >= ? AND start_time < ? AND id <= ?"
+
+HOURLY_ROLLUP_SQL = """
+    SELECT h.hour, h.app_name, h.category, h.duration_seconds, h.sessions,
+           COALESCE(s.display_name, h.app_name) as display_name,
+           s.hex_color
+    FROM activity_hourly h
+    LEFT JOIN app_settings s ON h.app_name = s.app_name
+    WHERE h.day = ?
+"""
+
+# Total de sessões do dia sem filtros, somado do rollup
+DAY_SESSION_TOTAL_SQL = "SELECT COALESCE(SUM(sessions), 0) FROM activity_hourly WHERE day = ?"
+
+# Paginação por chave: linhas depois do cursor (start_time, id) da página anterior
+SESSION_KEYSET = " AND (l.start_time < ? OR (l.start_time = ? AND l.id < ?))"
+
+
+def epoch_ms_to_local(values):
+    """Converte uma série de epoch (ms) para datetime local ingênuo (sem fuso)."""
+    utc = pd.to_datetime(values, unit='ms', utc=True, errors='coerce')
+    return utc.dt.tz_convert(LOCAL_TZ).dt.tz_localize(None)
+
+def fetch_available_dates(conn) -> List[datetime.date]:
+    """Lista os dias com atividade (mais recente primeiro) a partir do rollup por hora."""
+    cursor = conn.cursor()
+    cursor.execute(AVAILABLE_DATES_SQL)
+    return [datetime.datetime.strptime(row[0], "%Y-%m-%d").date() for row in cursor.fetchall()]
+
+def fetch_archived_sessions(conn, start_ms: int, end_ms: int, archive_dir: str) -> pd.DataFrame:
+    """
+    Sessões arquivadas em Parquet no intervalo, com as configurações dos apps aplicadas.
+    O arquivo não guarda a categoria: as regras atuais são aplicadas por par (app, título).
+    """
+    df = archive.load_archived_sessions(start_ms, end_ms, archive_dir)
+    if df.empty:
+        return df
+    settings_df = pd.read_sql_query(
+        "SELECT app_name, display_name, hex_color FROM app_settings", conn
+    )
+    df = df.merge(settings_df, on='app_name', how='left')
+    df['display_name'] = df['display_name'].fillna(df['app_name'])
+
+    cursor = conn.cursor()
+    matcher = CategoryMatcher(load_category_rules(cursor))
+    app_categories = load_app_categories(cursor)
+    pairs = df[['app_name', 'window_title']].drop_duplicates()
+    pairs['category'] = [
+        matcher.resolve(app, title, app_categories) or UNCATEGORIZED
+        for app, title in pairs.itertuples(index=False)
+    ]
+    return df.merge(pairs, on=['app_name', 'window_title'], how='left')
+
+def fetch_day_sessions(conn, day, title_pattern=None, archive_dir: Optional[str] = None,
+                       after_id: Optional[int] = None) -> pd.DataFrame:
+    """
+    Carrega apenas as sessões do dia informado (SQLite + arquivo Parquet) e faz pré-processamento.
+    Títulos sem clean_title materializado são limpos aqui, de forma vetorizada, com `title_pattern`.
+    Com `after_id`, traz só as linhas do SQLite com id maior (cauda nova; o arquivo não é lido).
+    """
+    # Consulta por faixa de start_time (usa idx_activity_start)
+    start_ms, end_ms = day_bounds_ms(day)
+    query = DAY_SESSIONS_SQL
+    params: Tuple = (start_ms, end_ms)
+    if after_id is not None:
+        query += " AND l.id > ?"
+        params += (after_id,)
+    with span("load_data.sql"):
+        df = pd.read_sql_query(query, conn, params=params)
+
+    # Camada fria (Parquet): une os meses já arquivados ao que ainda está no SQLite
+    if after_id is None and archive_dir and archive.has_archive(archive_dir):
+        with span("load_data.archive"):
+            df_cold = fetch_archived_sessions(conn, start_ms, end_ms, archive_dir)
+        if not df_cold.empty:
+            df = pd.concat([df, df_cold], ignore_index=True).drop_duplicates(subset='id')
+
+    if df.empty:
+        return pd.DataFrame()
+
+    # Timestamps em epoch (ms): conversão vetorizada, sem parsing de texto
+    with span("load_data.timestamps"):
+        df['start_time'] = epoch_ms_to_local(df['start_time'])
+        df['end_time'] = epoch_ms_to_local(df['end_time'])
+        df = df.dropna(subset=['start_time'])
+
+        df['date'] = df['start_time'].dt.date
+        df['hour'] = df['start_time'].dt.hour
+    df['category'] = df['category'].fillna(UNCATEGORIZED)
+
+    missing = df['clean_title'].isna()
+    if missing.any():
+        with span("load_data.titles"):
+            df.loc[missing, 'clean_title'] = clean_titles(df.loc[missing, 'window_title'], title_pattern)
+
+    return df
+
+def fetch_hourly_rollup(conn, day) -> pd.DataFrame:
+    """Carrega o rollup (hora x app x categoria) de um dia, já com as configurações de exibição."""
+    return pd.read_sql_query(HOURLY_ROLLUP_SQL, conn, params=(str(day),))
+
+def count_day_rows(conn, day, max_id: int) -> int:
+    """Linhas do dia no SQLite com id <= max_id (muda se algo antigo foi apagado ou compactado)."""
+    start_ms, end_ms = day_bounds_ms(day)
+    return conn.execute(COUNT_DAY_ROWS_SQL, (start_ms, end_ms, max_id)).fetchone()[0]
+
+def settings_signature(conn) -> int:
+    """Assinatura das configurações que alteram linhas já carregadas (apps e regras de título/categoria)."""
+    apps = conn.execute(
+        "SELECT app_name, display_name, hex_color, category FROM app_settings ORDER BY app_name"
+    ).fetchall()
+    rules = conn.execute("SELECT pattern, is_regex FROM title_rules ORDER BY id").fetchall()
+    category_rules = conn.execute(
+        "SELECT field, pattern, is_regex, category FROM category_rules ORDER BY id"
+    ).fetchall()
+    return hash((tuple(apps), tuple(rules), tuple(category_rules)))
+
+
+@dataclass
+class DayFrame:
+    df: pd.DataFrame
+    last_id: int
+    sql_rows: int
+    signature: Tuple[int, Tuple]
+
+
+class DayFrameStore:
+    """
+    Sessões de cada dia já carregadas, atualizadas pela cauda: a cada mudança no banco só
+    as linhas com id maior que o último visto são lidas e anexadas. O dia é recarregado
+    inteiro se linhas antigas sumiram (compactação/arquivamento), se as configurações
+    de apps/títulos mudaram ou se as partições Parquet do dia ganharam partes (merge).
+    """
+
+    def __init__(self, max_days: int = 8):
+        self.max_days = max_days
+        self._frames: Dict[str, DayFrame] = {}
+        self._lock = threading.Lock()
+        self.full_loads = 0
+        self.tail_loads = 0
+
+    def get(self, conn, day, title_pattern=None, archive_dir: Optional[str] = None) -> pd.DataFrame:
+        key = str(day)
+        archive_state: Tuple = ()
+        if archive_dir and archive.has_archive(archive_dir):
+            archive_state = archive.partition_state(archive_dir, archive.months_between(*day_bounds_ms(day)))
+        signature = (settings_signature(conn), archive_state)
+        with self._lock:
+            frame = self._frames.get(key)
+
+        if (frame is not None and frame.signature == signature
+                and count_day_rows(conn, day, frame.last_id) == frame.sql_rows):
+            tail = fetch_day_sessions(conn, day, title_pattern, after_id=frame.last_id)
+            self.tail_loads += 1
+            if tail.empty:
+                return frame.df
+            df = pd.concat([frame.df, tail], ignore_index=True).drop_duplicates(subset='id', keep='last')
+            last_id = int(tail['id'].max())
+            frame = DayFrame(df, last_id, frame.sql_rows + len(tail), signature)
+        else:
+            df = fetch_day_sessions(conn, day, title_pattern, archive_dir)
+            self.full_loads += 1
+            if df.empty:
+                return df
+            last_id = int(df['id'].max())
+            frame = DayFrame(df, last_id, count_day_rows(conn, day, last_id), signature)
+
+        with self._lock:
+            self._frames.pop(key, None)
+            self._frames[key] = frame
+            while len(self._frames) > self.max_days:
+                self._frames.pop(next(iter(self._frames)))
+        return frame.df
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+
+    def stats(self) -> dict:
+        return {"days": len(self._frames), "full_loads": self.full_loads, "tail_loads": self.tail_loads}
+
+
+# Cursor da paginação por chave: (start_time em epoch ms, id) da última linha da página
+PageCursor = Tuple[int, int]
+
+
+@dataclass
+class SessionPage:
+    """Uma página do histórico de sessões (mais recentes primeiro)."""
+    df: pd.DataFrame
+    next_cursor: Optional[PageCursor]
+    total: int
+
+
+def _session_filters(app: Optional[str], category: Optional[str], title: Optional[str]) -> Tuple[str, tuple]:
+    clauses, params = [], []
+    if app:
+        clauses.append("COALESCE(s.display_name, l.app_name) = ?")
+        params.append(app)
+    if category:
+        clauses.append("l.category = ?")
+        params.append(category)
+    if title:
+        escaped = title.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        clauses.append("l.window_title LIKE ? ESCAPE '\\'")
+        params.append(f"%{escaped}%")
+    return "".join(f" AND {clause}" for clause in clauses), tuple(params)
+
+def _session_page_sql(filters: str = "", keyset: str = "") -> Tuple[str, str]:
+    """SQL da contagem e da página do histórico com os filtros (e o cursor) informados."""
+    base = f"""
+        FROM activity_sessions l
+        LEFT JOIN app_settings s ON l.app_name = s.app_name
+        WHERE l.start_time >= ? AND l.start_time < ?{filters}
+    """
+    page = f"""
+        SELECT l.id, l.start_time, l.end_time, l.app_name, l.window_title, l.clean_title,
+               l.duration_seconds, l.category,
+               COALESCE(s.display_name, l.app_name) as display_name
+        {base}{keyset}
+        ORDER BY l.start_time DESC, l.id DESC
+        LIMIT ?
+    """
+    return f"SELECT COUNT(*) {base}", page
+
+def fetch_sessions_page(conn, day, page_size: int = 50, after: Optional[PageCursor] = None,
+                        app: Optional[str] = None, category: Optional[str] = None,
+                        title: Optional[str] = None, title_pattern=None,
+                        total: Optional[int] = None) -> SessionPage:
+    """
+    Página de sessões do dia em ordem decrescente de start_time, por paginação de chave
+    (start_time, id): cada página custa o mesmo, independentemente do tamanho do dia.
+    Filtros opcionais: nome exibido do app, categoria e trecho do título.
+    `after` é o next_cursor da página anterior; `total`, o total já conhecido dos mesmos
+    filtros (evita recontar a cada página).
+    """
+    start_ms, end_ms = day_bounds_ms(day)
+    filters, filter_params = _session_filters(app, category, title)
+    keyset = SESSION_KEYSET if after is not None else ""
+    count_sql, page_sql = _session_page_sql(filters, keyset)
+    params = (start_ms, end_ms) + filter_params
+
+    if total is None and not filters:
+        # Sem filtros, o total vem do rollup (soma de poucas linhas em vez de contar o dia)
+        total = conn.execute(DAY_SESSION_TOTAL_SQL, (str(day),)).fetchone()[0]
+    elif total is None:
+        total = conn.execute(count_sql, params).fetchone()[0]
+
+    if after is not None:
+        params += (after[0], after[0], after[1])
+    df = pd.read_sql_query(page_sql, conn, params=params + (page_size + 1,))
+
+    next_cursor = None
+    if len(df) > page_size:
+        df = df.iloc[:page_size].copy()
+        last = df.iloc[-1]
+        next_cursor = (int(last['start_time']), int(last['id']))
+    df['start_time'] = epoch_ms_to_local(df['start_time'])
+    df['end_time'] = epoch_ms_to_local(df['end_time'])
+    missing = df['clean_title'].isna()
+    if missing.any():
+        df.loc[missing, 'clean_title'] = clean_titles(df.loc[missing, 'window_title'], title_pattern)
+    return SessionPage(df, next_cursor, total)
+
+def page_frame(df: pd.DataFrame, page_size: int = 50, after: Optional[PageCursor] = None,
+               app: Optional[str] = None, category: Optional[str] = None,
+               title: Optional[str] = None) -> SessionPage:
+    """
+    Mesma paginação de fetch_sessions_page sobre um DataFrame já carregado
+    (dias arquivados em Parquet, que não estão mais no SQLite).
+    """
+    if df.empty:
+        return SessionPage(df, None, 0)
+    view = df
+    if app:
+        view = view[view['display_name'] == app]
+    if category:
+        view = view[view['category'] == category]
+    if title:
+        view = view[view['window_title'].fillna('').str.contains(title, case=False, regex=False)]
+
+    view = view.assign(_start_ms=view['start_time'].astype('datetime64[ms]').astype('int64'))
+    view = view.sort_values(['_start_ms', 'id'], ascending=False)
+    total = len(view)
+    if after is not None:
+        view = view[(view['_start_ms'] < after[0]) | ((view['_start_ms'] == after[0]) & (view['id'] < after[1]))]
+
+    page = view.head(page_size + 1)
+    next_cursor = None
+    if len(page) > page_size:
+        page = page.iloc[:page_size]
+        next_cursor = (int(page['_start_ms'].iloc[-1]), int(page['id'].iloc[-1]))
+    return SessionPage(page.drop(columns='_start_ms'), next_cursor, total)
+
+def query_plan_checks() -> Dict[str, Tuple[str, tuple, Tuple[str, ...]]]:
+    """
+    Consultas do dashboard, com parâmetros de exemplo, e os trechos aceitos no plano de cada
+    uma (ver ProductivityTracker.check_query_plans). Usa o mesmo SQL das funções acima.
+    Faixas de start_time podem vir por idx_activity_start ou, app a app, por idx_activity_app_start.
+    Nenhum plano pode ordenar em B-tree temporária: a lista de datas, por exemplo, só é aceita
+    percorrendo a chave primária do rollup já na ordem de `day`.
+    """
+    day = "2024-01-01"
+    start_ms, end_ms = day_bounds_ms(day)
+    cursor = (end_ms - 1, end_ms - 1, 2 ** 62)
+    day_range = ("idx_activity_start", "idx_activity_app_start")
+    rollup_day = ("USING PRIMARY KEY (day=?)",)
+    _, page_sql = _session_page_sql()
+    _, next_page_sql = _session_page_sql(keyset=SESSION_KEYSET)
+    app_filter, app_params = _session_filters("opera.exe", None, None)
+    app_count_sql, app_page_sql = _session_page_sql(app_filter, SESSION_KEYSET)
+    return {
+        "available_dates": (AVAILABLE_DATES_SQL, (), ("SCAN activity_hourly",)),
+        "day_sessions": (DAY_SESSIONS_SQL, (start_ms, end_ms), day_range),
+        "count_day_rows": (COUNT_DAY_ROWS_SQL, (start_ms, end_ms, 0), day_range),
+        "hourly_rollup": (HOURLY_ROLLUP_SQL, (day,), rollup_day),
+        "page_total": (DAY_SESSION_TOTAL_SQL, (day,), rollup_day),
+        "sessions_page": (page_sql, (start_ms, end_ms, 51), day_range),
+        "sessions_page_next": (next_page_sql, (start_ms, end_ms) + cursor + (51,), day_range),
+        "sessions_page_app_count": (app_count_sql, (start_ms, end_ms) + app_params, day_range),
+        "sessions_page_app": (app_page_sql, (start_ms, end_ms) + app_params + cursor + (51,), day_range),
+    }
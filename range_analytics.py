@@ -0,0 +1,114 @@
+import sqlite3
+import datetime
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from aggregation import format_durations
+from tracker import DB_NAME
+
+# Modos de período do dashboard (rótulo exibido -> chave interna)
+PERIOD_MODES = {
+    "Dia": "day",
+    "Semana": "week",
+    "Mês": "month",
+    "Ano": "year",
+    "Personalizado": "custom",
+}
+
+
+@dataclass
+class RangeSummary:
+    """Agregados de um intervalo de dias, calculados em SQL sobre o activity_hourly."""
+    start: datetime.date
+    end: datetime.date
+    total_seconds: float = 0.0
+    sessions: int = 0
+    days_with_data: int = 0
+    # display_name, hex_color, duration_seconds, sessions, formatted_time
+    app_totals: pd.DataFrame = field(default_factory=pd.DataFrame)
+    # category, duration_seconds, formatted_time
+    category_totals: pd.DataFrame = field(default_factory=pd.DataFrame)
+    # day, hour, duration_seconds (matriz dia x hora)
+    heatmap: pd.DataFrame = field(default_factory=pd.DataFrame)
+    # day, duration_seconds, delta_seconds (variação em relação ao dia anterior com dados)
+    daily: pd.DataFrame = field(default_factory=pd.DataFrame)
+
+
+def period_bounds(mode: str, anchor: datetime.date) -> Tuple[datetime.date, datetime.date]:
+    """Retorna o intervalo [início, fim] (inclusivo) do período que contém `anchor`."""
+    if mode == "week":
+        start = anchor - datetime.timedelta(days=anchor.weekday())
+        return start, start + datetime.timedelta(days=6)
+    if mode == "month":
+        start = anchor.replace(day=1)
+        next_month = (start + datetime.timedelta(days=32)).replace(day=1)
+        return start, next_month - datetime.timedelta(days=1)
+    if mode == "year":
+        return anchor.replace(month=1, day=1), anchor.replace(month=12, day=31)
+    return anchor, anchor
+
+def load_range_summary(start: datetime.date, end: datetime.date, db_path: str = DB_NAME,
+                       conn: Optional[sqlite3.Connection] = None) -> RangeSummary:
+    """
+    Calcula os agregados de [start, end] direto no SQLite. O custo depende de dias x horas x apps
+    do rollup (PK começa por day), nunca do número de sessões brutas.
+    Com `conn` (ex.: conexão do pool de leitura), usa-a em vez de abrir uma nova.
+    """
+    summary = RangeSummary(start=start, end=end)
+    params = (start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
+
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(db_path)
+    try:
+        apps = pd.read_sql_query("""
+            SELECT COALESCE(s.display_name, h.app_name) AS display_name,
+                   MAX(s.hex_color) AS hex_color,
+                   SUM(h.duration_seconds) AS duration_seconds,
+                   SUM(h.sessions) AS sessions
+            FROM activity_hourly h
+            LEFT JOIN app_settings s ON s.app_name = h.app_name
+            WHERE h.day BETWEEN ? AND ?
+            GROUP BY 1
+            ORDER BY duration_seconds DESC
+        """, conn, params=params)
+
+        categories = pd.read_sql_query("""
+            SELECT category, SUM(duration_seconds) AS duration_seconds
+            FROM activity_hourly
+            WHERE day BETWEEN ? AND ?
+            GROUP BY category
+            ORDER BY duration_seconds DESC
+        """, conn, params=params)
+
+        heatmap = pd.read_sql_query("""
+            SELECT day, hour, SUM(duration_seconds) AS duration_seconds
+            FROM activity_hourly
+            WHERE day BETWEEN ? AND ?
+            GROUP BY day, hour
+            ORDER BY day, hour
+        """, conn, params=params)
+    finally:
+        if own_conn:
+            conn.close()
+
+    if apps.empty:
+        return summary
+
+    apps['formatted_time'] = format_durations(apps['duration_seconds'])
+    categories['formatted_time'] = format_durations(categories['duration_seconds'])
+
+    daily = heatmap.groupby('day', sort=True)['duration_seconds'].sum().reset_index()
+    daily['delta_seconds'] = daily['duration_seconds'].diff()
+    daily['formatted_time'] = format_durations(daily['duration_seconds'])
+
+    summary.total_seconds = float(apps['duration_seconds'].sum())
+    summary.sessions = int(apps['sessions'].sum())
+    summary.days_with_data = len(daily)
+    summary.app_totals = apps
+    summary.category_totals = categories
+    summary.heatmap = heatmap
+    summary.daily = daily
+    return summary
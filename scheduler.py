@@ -0,0 +1,76 @@
+import time
+from typing import Optional
+
+import profiling
+
+# Limites padrão do intervalo de amostragem (s)
+DEFAULT_MIN_INTERVAL = 1.0
+DEFAULT_MAX_INTERVAL = 5.0
+# Multiplicador aplicado a cada amostra sem troca de janela
+DEFAULT_BACKOFF = 1.5
+# Sem entrada do usuário há este tempo (s), o intervalo pode crescer até DEFAULT_IDLE_MAX_INTERVAL
+DEFAULT_IDLE_THRESHOLD = 120.0
+DEFAULT_IDLE_MAX_INTERVAL = 30.0
+
+
+class AdaptiveScheduler:
+    """
+    Decide o intervalo até a próxima amostra do tracker e aguarda por ele.
+
+    Logo após uma troca de janela a amostragem volta para `min_interval` (trocas curtas
+    não são perdidas); sem trocas, o intervalo cresce `backoff` vezes por amostra até
+    `max_interval`, ou até `idle_max_interval` se o usuário estiver ocioso (sem teclado/mouse
+    há `idle_threshold` segundos). A espera usa o evento de parada, sem acordar à toa.
+    """
+
+    def __init__(self, clock, stop_event=None, min_interval: float = DEFAULT_MIN_INTERVAL,
+                 max_interval: float = DEFAULT_MAX_INTERVAL, backoff: float = DEFAULT_BACKOFF,
+                 idle_threshold: float = DEFAULT_IDLE_THRESHOLD,
+                 idle_max_interval: float = DEFAULT_IDLE_MAX_INTERVAL):
+        self.clock = clock
+        self.stop_event = stop_event
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.backoff = max(backoff, 1.0)
+        self.idle_threshold = idle_threshold
+        self.idle_max_interval = max(idle_max_interval, self.max_interval)
+        self.interval = min_interval
+        self.idle = False
+
+        # Métricas
+        self.wakeups = 0
+        self.switches = 0
+        self._started = time.monotonic()
+
+    def next_interval(self, changed: bool, idle_seconds: Optional[float] = None) -> float:
+        """Atualiza o intervalo a partir do resultado da última amostra."""
+        self.idle = idle_seconds is not None and idle_seconds >= self.idle_threshold
+        if changed:
+            self.switches += 1
+            self.interval = self.min_interval
+        else:
+            ceiling = self.idle_max_interval if self.idle else self.max_interval
+            self.interval = min(self.interval * self.backoff, ceiling)
+        return self.interval
+
+    def wait(self, interval: Optional[float] = None) -> bool:
+        """Dorme até a próxima amostra; retorna True se a parada foi solicitada."""
+        stopped = self.clock.wait(self.stop_event, self.interval if interval is None else interval)
+        self.wakeups += 1
+        profiling.set_gauge("scheduler.wakeups", self.wakeups)
+        profiling.set_gauge("scheduler.wakeups_per_s", round(self.wakeups_per_second(), 4))
+        profiling.set_gauge("scheduler.interval_s", round(self.interval, 3))
+        return stopped
+
+    def wakeups_per_second(self) -> float:
+        elapsed = time.monotonic() - self._started
+        return self.wakeups / elapsed if elapsed > 0 else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "wakeups": self.wakeups,
+            "wakeups_per_s": round(self.wakeups_per_second(), 4),
+            "switches": self.switches,
+            "interval_s": round(self.interval, 3),
+            "idle": self.idle,
+        }
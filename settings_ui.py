@@ -1,5 +1,9 @@
 import streamlit as st
 import os
+import re
+
+import category_rules
+from title_rules import format_rules_text, parse_rules_text
 
 # Lista pré-definida de categorias
 CATEGORIES = [
@@ -14,14 +18,21 @@ CATEGORIES = [
     "Outros"
 ]
 
-def render_settings_ui(tracker):
-    """Renderiza a interface de configuração de aplicativos na Sidebar."""
+def render_settings_ui(tracker, query_cache=None):
+    """
+    Renderiza a interface de configuração de aplicativos na Sidebar.
+    Se `query_cache` (cache.DataVersionCache) for informado, as leituras passam por ele.
+    """
     with st.sidebar.expander("⚙️ Personalizar Apps"):
         st.caption("Defina nomes amigáveis, cores e categorias.")
         
         # Carregar dados
-        all_apps = tracker.get_all_apps()
-        current_settings = tracker.get_app_settings()
+        if query_cache is not None:
+            all_apps = query_cache.get("all_apps", (), tracker.get_all_apps)
+            current_settings = query_cache.get("app_settings", (), tracker.get_app_settings)
+        else:
+            all_apps = tracker.get_all_apps()
+            current_settings = tracker.get_app_settings()
         
         if not all_apps:
             st.info("Nenhum app registrado.")
@@ -60,4 +71,73 @@ def render_settings_ui(tracker):
                     # Passamos os novos parâmetros atualizados (sem ícone)
                     if tracker.update_app_setting(selected_app, new_display, new_color, new_category):
                         st.success("Salvo!")
-                        st.rerun()
\ No newline at end of file
+                        st.rerun()
+
+def render_title_rules_ui(tracker, query_cache=None):
+    """
+    Editor das regras de limpeza de títulos (sufixos de navegador etc.) na Sidebar.
+    Se `query_cache` for informado, a leitura das regras passa por ele.
+    """
+    with st.sidebar.expander("🧹 Limpeza de Títulos"):
+        st.caption("Um trecho por linha, removido dos títulos. Use 're:' no início para regex.")
+
+        if query_cache is not None:
+            current_rules = query_cache.get("title_rules", (), tracker.get_title_rules)
+        else:
+            current_rules = tracker.get_title_rules()
+
+        with st.form(key="form_title_rules"):
+            rules_text = st.text_area(
+                "Regras",
+                value=format_rules_text(current_rules),
+                height=200
+            )
+
+            if st.form_submit_button("💾 Salvar"):
+                try:
+                    rules = parse_rules_text(rules_text)
+                except re.error as e:
+                    st.error(f"Regex inválida: {e}")
+                    return
+                if tracker.update_title_rules(rules):
+                    st.success("Salvo!")
+                    st.rerun()
+
+def render_category_rules_ui(tracker, query_cache=None):
+    """
+    Editor das regras de categorização (app/título -> categoria) na Sidebar.
+    Se `query_cache` for informado, a leitura das regras passa por ele.
+    """
+    with st.sidebar.expander("🏷️ Regras de Categoria"):
+        st.caption(
+            "Uma regra por linha: 'trecho do título => Categoria'. Use 'app:' para casar com o "
+            "executável e 're:' para regex. A primeira regra que casar vence; sem regra, vale a "
+            "categoria do app."
+        )
+
+        if query_cache is not None:
+            current_rules = query_cache.get("category_rules", (), tracker.get_category_rules)
+        else:
+            current_rules = tracker.get_category_rules()
+
+        with st.form(key="form_category_rules"):
+            rules_text = st.text_area(
+                "Regras",
+                value=category_rules.format_rules_text(current_rules),
+                height=200
+            )
+
+            if st.form_submit_button("💾 Salvar e Recategorizar"):
+                try:
+                    rules = category_rules.parse_rules_text(rules_text)
+                except re.error as e:
+                    st.error(f"Regex inválida: {e}")
+                    return
+                except ValueError as e:
+                    st.error(f"Regra inválida: {e}")
+                    return
+                with st.spinner("Recategorizando o histórico..."):
+                    saved = tracker.update_category_rules(rules)
+                if saved:
+                    st.success("Salvo!")
+                    st.rerun()
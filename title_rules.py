@@ -0,0 +1,63 @@
+import re
+from typing import Iterable, List, Optional, Pattern, Tuple
+
+# Regra de limpeza: (padrão, é_regex). Padrões literais são escapados antes de compilar.
+TitleRule = Tuple[str, bool]
+
+UNTITLED = "Sem Título"
+
+# Prefixo usado no editor de texto para marcar uma regra como expressão regular
+REGEX_PREFIX = "re:"
+
+# Sufixos removidos por padrão para deixar apenas o nome do site/página
+DEFAULT_TITLE_RULES: List[TitleRule] = [
+    (" - Opera", False),
+    (" - Google Chrome", False),
+    (" - Microsoft Edge", False),
+    (" - Mozilla Firefox", False),
+    (" - Brave", False),
+    (" - Vivaldi", False),
+    (" - YouTube", False),
+]
+
+
+def compile_title_rules(rules: Iterable[TitleRule]) -> Optional[Pattern]:
+    """Compila todas as regras em uma única expressão (alternância); None se não houver regras."""
+    parts = [pattern if is_regex else re.escape(pattern) for pattern, is_regex in rules if pattern]
+    if not parts:
+        return None
+    return re.compile("|".join(f"(?:{part})" for part in parts))
+
+def clean_title(title: Optional[str], pattern: Optional[Pattern]) -> str:
+    """Remove de um título os trechos casados pelas regras."""
+    if not title:
+        return UNTITLED
+    return pattern.sub("", title) if pattern is not None else title
+
+def clean_titles(titles, pattern: Optional[Pattern]):
+    """Versão vetorizada de clean_title para uma pandas.Series."""
+    titles = titles.fillna('')
+    clean = titles.str.replace(pattern, '', regex=True) if pattern is not None else titles
+    return clean.mask(titles == '', UNTITLED)
+
+def parse_rules_text(text: str) -> List[TitleRule]:
+    """
+    Converte o texto do editor (uma regra por linha) em regras.
+    Linhas iniciadas por 're:' são expressões regulares; re.error indica regex inválida
+    (inclusive as que só falham dentro da expressão combinada, como flags globais no meio).
+    Espaços são preservados, pois fazem parte dos sufixos (ex.: ' - Opera').
+    """
+    rules: List[TitleRule] = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        if line.startswith(REGEX_PREFIX):
+            rules.append((line[len(REGEX_PREFIX):], True))
+        else:
+            rules.append((line, False))
+    compile_title_rules(rules)
+    return rules
+
+def format_rules_text(rules: Iterable[TitleRule]) -> str:
+    """Operação inversa de parse_rules_text."""
+    return "\n".join(f"{REGEX_PREFIX}{pattern}" if is_regex else pattern for pattern, is_regex in rules)
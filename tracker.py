@@ -1,14 +1,16 @@
 import sqlite3
 import time
-import os
 import shutil
 import datetime
 import logging
-from typing import Optional, Tuple
-import win32gui
-import win32process
-import win32api
-import win32con
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from probes import SystemClock, WindowProbe
+from profiling import span
+from category_rules import DEFAULT_CATEGORY_RULES, UNCATEGORIZED, CategoryMatcher, CategoryRule
+from title_rules import DEFAULT_TITLE_RULES, TitleRule, clean_title, compile_title_rules
 
 # Configuração de Logging
 logging.basicConfig(
@@ -19,9 +21,416 @@ logging.basicConfig(
 
 DB_NAME = "productivity.db"
 
+# Versão do esquema gravada em PRAGMA user_version
+SCHEMA_VERSION = 6
+
+# activity_log normalizado: nomes de app e títulos ficam em tabelas de dimensão
+ACTIVITY_LOG_DDL = """
+    CREATE TABLE IF NOT EXISTS activity_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        app_id INTEGER NOT NULL REFERENCES apps (id),
+        title_id INTEGER REFERENCES window_titles (id),
+        start_time INTEGER NOT NULL, -- epoch em milissegundos
+        end_time INTEGER,            -- epoch em milissegundos
+        duration_seconds REAL,
+        category_id INTEGER REFERENCES categories (id) -- materializada na ingestão (NULL = sem categoria)
+    )
+"""
+
+DIMENSION_DDL = [
+    "CREATE TABLE IF NOT EXISTS apps (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)",
+    # clean_title: título já limpo pelas regras de title_rules (materializado na ingestão)
+    "CREATE TABLE IF NOT EXISTS window_titles (id INTEGER PRIMARY KEY, title TEXT NOT NULL UNIQUE, clean_title TEXT)",
+    "CREATE TABLE IF NOT EXISTS categories (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)",
+]
+
+# Regras de limpeza de títulos (sufixos de navegador etc.), editáveis no settings_ui
+TITLE_RULES_DDL = """
+    CREATE TABLE IF NOT EXISTS title_rules (
+        id INTEGER PRIMARY KEY,
+        pattern TEXT NOT NULL,
+        is_regex INTEGER NOT NULL DEFAULT 0
+    )
+"""
+
+# Identificador do banco/dispositivo (gerado uma vez; usado pelo merge.py para saber a origem)
+DEVICE_INFO_DDL = "CREATE TABLE IF NOT EXISTS {schema}.device_info (device_id TEXT NOT NULL)"
+
+# Mapa (app, título) -> categoria aplicado por recategorize_history; título NULL vira -1 na chave
+RECATEGORIZE_MAP_DDL = """
+    CREATE TEMP TABLE IF NOT EXISTS recategorize_map (
+        app_id INTEGER NOT NULL,
+        title_key INTEGER NOT NULL,
+        category_id INTEGER,
+        PRIMARY KEY (app_id, title_key)
+    ) WITHOUT ROWID
+"""
+
+# Regras de categorização (app/título -> categoria), editáveis no settings_ui
+CATEGORY_RULES_DDL = """
+    CREATE TABLE IF NOT EXISTS category_rules (
+        id INTEGER PRIMARY KEY,
+        field TEXT NOT NULL DEFAULT 'title', -- 'app' ou 'title'
+        pattern TEXT NOT NULL,
+        is_regex INTEGER NOT NULL DEFAULT 0,
+        category TEXT NOT NULL
+    )
+"""
+
+# Visão desnormalizada para leitura (mesmas colunas do activity_log antigo)
+ACTIVITY_VIEW_DDL = f"""
+    CREATE VIEW IF NOT EXISTS activity_sessions AS
+    SELECT l.id, a.name AS app_name, t.title AS window_title, t.clean_title,
+           l.start_time, l.end_time, l.duration_seconds,
+           COALESCE(c.name, '{UNCATEGORIZED}') AS category
+    FROM activity_log l
+    JOIN apps a ON a.id = l.app_id
+    LEFT JOIN window_titles t ON t.id = l.title_id
+    LEFT JOIN categories c ON c.id = l.category_id
+"""
+
+# Rollup incremental por (dia local, hora, app, categoria), mantido por insert_activity
+HOURLY_ROLLUP_DDL = f"""
+    CREATE TABLE IF NOT EXISTS activity_hourly (
+        day TEXT NOT NULL,
+        hour INTEGER NOT NULL,
+        app_name TEXT NOT NULL,
+        category TEXT NOT NULL DEFAULT '{UNCATEGORIZED}',
+        duration_seconds REAL NOT NULL DEFAULT 0,
+        sessions INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, hour, app_name, category)
+    ) WITHOUT ROWID
+"""
+
+# Índices do activity_log: faixa de datas e (app, data)
+ACTIVITY_INDEXES = {
+    "idx_activity_start": "CREATE INDEX IF NOT EXISTS idx_activity_start ON activity_log (start_time)",
+    "idx_activity_app_start": "CREATE INDEX IF NOT EXISTS idx_activity_app_start ON activity_log (app_id, start_time)",
+}
+
+# Consulta do próprio tracker e os trechos aceitos no plano; as do dashboard vêm de
+# queries.query_plan_checks (ver check_query_plans)
+GET_ALL_APPS_SQL = "SELECT name FROM apps ORDER BY name"
+QUERY_PLAN_CHECKS = {
+    "get_all_apps": (GET_ALL_APPS_SQL, (), ("sqlite_autoindex_apps_1",)),
+}
+
+# Trecho do plano que reprova qualquer consulta verificada (DISTINCT/ORDER BY fora do índice)
+TEMP_BTREE_PLAN = "USE TEMP B-TREE"
+
+def to_epoch_ms(timestamp: float) -> int:
+    """Converte epoch em segundos (time.time) para o inteiro em milissegundos gravado no banco."""
+    return int(round(timestamp * 1000))
+
+def from_epoch_ms(value: int) -> datetime.datetime:
+    """Converte epoch em milissegundos para datetime local."""
+    return datetime.datetime.fromtimestamp(value / 1000)
+
+class DimensionInterner:
+    """
+    Cache em memória dos ids de apps/window_titles/categories, usado pelo writer.
+    Evita consultar o banco a cada troca de janela para nomes e títulos já vistos.
+    Também guarda a categoria já resolvida de cada par (app, título).
+    """
+
+    TABLES = {"apps": "name", "window_titles": "title", "categories": "name"}
+
+    def __init__(self, max_entries: int = 20000):
+        self.max_entries = max_entries
+        self._ids = {table: OrderedDict() for table in self.TABLES}
+        self.hits = 0
+        self.misses = 0
+        # Regras de limpeza usadas para materializar window_titles.clean_title
+        self._title_rules: Optional[List[TitleRule]] = None
+        self._title_pattern = None
+        # Regras de categorização + categorias manuais dos apps, e o resultado por (app, título)
+        self._category_source: Optional[tuple] = None
+        self._category_matcher: Optional[CategoryMatcher] = None
+        self._app_categories: Dict[str, Optional[str]] = {}
+        self._categorized: "OrderedDict[Tuple[str, Optional[str]], Tuple[Optional[int], str]]" = OrderedDict()
+
+    def refresh_title_rules(self, cursor):
+        """Recarrega as regras de limpeza se tiverem mudado no banco."""
+        rules = load_title_rules(cursor)
+        if rules != self._title_rules:
+            self._title_rules = rules
+            self._title_pattern = compile_title_rules(rules)
+
+    def refresh_category_rules(self, cursor):
+        """Recarrega as regras de categorização e as categorias manuais se tiverem mudado no banco."""
+        rules = load_category_rules(cursor)
+        app_categories = load_app_categories(cursor)
+        source = (rules, app_categories)
+        if source != self._category_source:
+            self._category_source = source
+            self._category_matcher = CategoryMatcher(rules)
+            self._app_categories = app_categories
+            self._categorized.clear()
+
+    def categorize(self, cursor, app_name: str, window_title: Optional[str]) -> Tuple[Optional[int], str]:
+        """Retorna (category_id, nome da categoria) da sessão, pelas regras ou pela categoria do app."""
+        key = (app_name, window_title)
+        cached = self._categorized.get(key)
+        if cached is not None:
+            self._categorized.move_to_end(key)
+            return cached
+
+        if self._category_matcher is None:
+            self.refresh_category_rules(cursor)
+        category = self._category_matcher.resolve(app_name, window_title, self._app_categories)
+        result = (self.intern(cursor, "categories", category), category or UNCATEGORIZED)
+        self._categorized[key] = result
+        if len(self._categorized) > self.max_entries:
+            self._categorized.popitem(last=False)
+        return result
+
+    def intern(self, cursor, table: str, value: Optional[str]) -> Optional[int]:
+        """Retorna o id de `value` na tabela de dimensão, inserindo-o se necessário."""
+        if value is None:
+            return None
+        cache = self._ids[table]
+        row_id = cache.get(value)
+        if row_id is not None:
+            cache.move_to_end(value)
+            self.hits += 1
+            return row_id
+
+        self.misses += 1
+        column = self.TABLES[table]
+        if table == "window_titles":
+            if self._title_rules is None:
+                self.refresh_title_rules(cursor)
+            cursor.execute(
+                "INSERT OR IGNORE INTO window_titles (title, clean_title) VALUES (?, ?)",
+                (value, clean_title(value, self._title_pattern))
+            )
+        else:
+            cursor.execute(f"INSERT OR IGNORE INTO {table} ({column}) VALUES (?)", (value,))
+        cursor.execute(f"SELECT id FROM {table} WHERE {column} = ?", (value,))
+        row_id = cursor.fetchone()[0]
+        cache[value] = row_id
+        if len(cache) > self.max_entries:
+            cache.popitem(last=False)
+        return row_id
+
+    def clear(self):
+        """Descarta o cache (ex.: após rollback, quando ids recém-criados deixam de existir)."""
+        for cache in self._ids.values():
+            cache.clear()
+        self._categorized.clear()
+
+def insert_activity(cursor, app_name: str, window_title: str, start: float, end: float,
+                    interner: Optional[DimensionInterner] = None) -> int:
+    """Insere uma sessão no activity_log, dividida nas viradas de hora. Retorna as linhas inseridas."""
+    interner = interner or DimensionInterner()
+    app_id = interner.intern(cursor, "apps", app_name)
+    title_id = interner.intern(cursor, "window_titles", window_title)
+    category_id, category = interner.categorize(cursor, app_name, window_title)
+    inserted = 0
+    current_start = start
+    while current_start < end:
+        dt_start = datetime.datetime.fromtimestamp(current_start)
+        next_hour = (dt_start + datetime.timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
+        ts_next_hour = next_hour.timestamp()
+        
+        current_end = min(end, ts_next_hour)
+        duration = current_end - current_start
+        
+        if duration >= 1.0:
+            cursor.execute("""
+                INSERT INTO activity_log (app_id, title_id, start_time, end_time, duration_seconds, category_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (app_id, title_id, 
+                  to_epoch_ms(current_start), 
+                  to_epoch_ms(current_end), 
+                  duration,
+                  category_id))
+            # Rollup por (dia, hora, app, categoria) na mesma transação do INSERT
+            cursor.execute("""
+                INSERT INTO activity_hourly (day, hour, app_name, category, duration_seconds, sessions)
+                VALUES (?, ?, ?, ?, ?, 1)
+                ON CONFLICT (day, hour, app_name, category) DO UPDATE SET
+                    duration_seconds = duration_seconds + excluded.duration_seconds,
+                    sessions = sessions + 1
+            """, (dt_start.strftime("%Y-%m-%d"), dt_start.hour, app_name, category, duration))
+            inserted += 1
+        
+        current_start = current_end
+    return inserted
+
+def load_title_rules(cursor) -> List[TitleRule]:
+    """Lê as regras de limpeza de títulos, na ordem de cadastro."""
+    cursor.execute("SELECT pattern, is_regex FROM title_rules ORDER BY id")
+    return [(pattern, bool(is_regex)) for pattern, is_regex in cursor.fetchall()]
+
+def refresh_clean_titles(cursor, rules: List[TitleRule]) -> int:
+    """Recalcula window_titles.clean_title para todos os títulos. Retorna quantos mudaram."""
+    pattern = compile_title_rules(rules)
+    cursor.execute("SELECT id, title, clean_title FROM window_titles")
+    updates = []
+    for row_id, title, current in cursor.fetchall():
+        clean = clean_title(title, pattern)
+        if clean != current:
+            updates.append((clean, row_id))
+    cursor.executemany("UPDATE window_titles SET clean_title = ? WHERE id = ?", updates)
+    return len(updates)
+
+def load_category_rules(cursor) -> List[CategoryRule]:
+    """Lê as regras de categorização, na ordem de prioridade (cadastro)."""
+    cursor.execute("SELECT field, pattern, is_regex, category FROM category_rules ORDER BY id")
+    return [(field, pattern, bool(is_regex), category) for field, pattern, is_regex, category in cursor.fetchall()]
+
+def load_app_categories(cursor) -> Dict[str, Optional[str]]:
+    """Categorias definidas manualmente por app (app_settings), usadas quando nenhuma regra casa."""
+    cursor.execute("SELECT app_name, category FROM app_settings WHERE category IS NOT NULL")
+    return dict(cursor.fetchall())
+
+def recategorize_history(cursor, app_name: Optional[str] = None, rebuild_rollup: bool = True) -> int:
+    """
+    Recalcula activity_log.category_id com as regras atuais (todo o histórico ou um app).
+
+    A categoria é resolvida uma vez por par (app, título) distinto; os pares que mudaram vão
+    para um mapa temporário aplicado por um único UPDATE, que percorre uma vez as linhas dos
+    apps afetados (idx_activity_app_start). Com `rebuild_rollup`, só o rollup desses apps é
+    recalculado. Retorna quantas linhas mudaram.
+    """
+    interner = DimensionInterner()
+    interner.refresh_category_rules(cursor)
+
+    where, params = "", ()
+    if app_name is not None:
+        where, params = "WHERE app_id = (SELECT id FROM apps WHERE name = ?)", (app_name,)
+    cursor.execute(f"""
+        SELECT p.app_id, p.title_id, p.category_id, a.name, t.title
+        FROM (SELECT DISTINCT app_id, title_id, category_id FROM activity_log {where}) p
+        JOIN apps a ON a.id = p.app_id
+        LEFT JOIN window_titles t ON t.id = p.title_id
+    """, params)
+
+    targets = {}
+    changed_apps = set()
+    for app_id, title_id, current, name, title in cursor.fetchall():
+        category_id, _ = interner.categorize(cursor, name, title)
+        if category_id != current:
+            targets[(app_id, -1 if title_id is None else title_id)] = category_id
+            changed_apps.add(name)
+    if not targets:
+        return 0
+
+    cursor.execute(RECATEGORIZE_MAP_DDL)
+    cursor.execute("DELETE FROM temp.recategorize_map")
+    cursor.executemany(
+        "INSERT INTO temp.recategorize_map (app_id, title_key, category_id) VALUES (?, ?, ?)",
+        [(app_id, title_key, category_id) for (app_id, title_key), category_id in targets.items()]
+    )
+    cursor.execute("""
+        UPDATE activity_log
+        SET category_id = (
+            SELECT m.category_id FROM temp.recategorize_map m
+            WHERE m.app_id = activity_log.app_id AND m.title_key = COALESCE(activity_log.title_id, -1)
+        )
+        WHERE app_id IN (SELECT DISTINCT app_id FROM temp.recategorize_map)
+          AND EXISTS (
+              SELECT 1 FROM temp.recategorize_map m
+              WHERE m.app_id = activity_log.app_id AND m.title_key = COALESCE(activity_log.title_id, -1)
+                AND m.category_id IS NOT activity_log.category_id
+          )
+    """)
+    changed = cursor.rowcount
+    cursor.execute("DELETE FROM temp.recategorize_map")
+
+    if rebuild_rollup:
+        for name in sorted(changed_apps):
+            rebuild_app_rollup(cursor, name)
+    return changed
+
+def ensure_device_id(cursor, schema: str = "main") -> str:
+    """Retorna o identificador do banco em `schema`, gerando-o na primeira vez."""
+    cursor.execute(DEVICE_INFO_DDL.format(schema=schema))
+    cursor.execute(f"SELECT device_id FROM {schema}.device_info")
+    row = cursor.fetchone()
+    if row:
+        return row[0]
+    device_id = uuid.uuid4().hex
+    cursor.execute(f"INSERT INTO {schema}.device_info (device_id) VALUES (?)", (device_id,))
+    return device_id
+
+def day_bounds_ms(day) -> Tuple[int, int]:
+    """Retorna o intervalo [início, fim) de um dia local (date ou 'YYYY-MM-DD') em epoch (ms)."""
+    if isinstance(day, str):
+        day = datetime.datetime.strptime(day, "%Y-%m-%d").date()
+    start = datetime.datetime.combine(day, datetime.time.min)
+    end = start + datetime.timedelta(days=1)
+    return int(start.timestamp() * 1000), int(end.timestamp() * 1000)
+
+def rebuild_hourly_rollup(cursor, day: Optional[str] = None):
+    """
+    Recalcula o activity_hourly a partir do activity_log (todo o histórico ou um dia 'YYYY-MM-DD').
+    Dias que já não têm registros brutos (meses arquivados em Parquet) mantêm o rollup existente.
+    """
+    local_start = "datetime(start_time / 1000, 'unixepoch', 'localtime')"
+    where = ""
+    params: Tuple = ()
+    if day is not None:
+        cursor.execute("DELETE FROM activity_hourly WHERE day = ?", (day,))
+        where = "WHERE start_time >= ? AND start_time < ?"
+        params = day_bounds_ms(day)
+    else:
+        # Só os dias com registros brutos: os arquivados podem ficar entre eles (merge, restauração)
+        cursor.execute(f"""
+            DELETE FROM activity_hourly
+            WHERE day IN (SELECT DISTINCT date({local_start}) FROM activity_log)
+        """)
+
+    cursor.execute(f"""
+        INSERT INTO activity_hourly (day, hour, app_name, category, duration_seconds, sessions)
+        SELECT date({local_start}),
+               CAST(strftime('%H', {local_start}) AS INTEGER),
+               app_name,
+               category,
+               SUM(duration_seconds),
+               COUNT(*)
+        FROM activity_sessions
+        {where}
+        GROUP BY 1, 2, 3, 4
+    """, params)
+
+def rebuild_app_rollup(cursor, app_name: str):
+    """
+    Recalcula as linhas de um app no activity_hourly (ex.: após mudar a categoria das sessões).
+    Só os dias em que o app ainda tem registros brutos são refeitos; as demais linhas não mudam.
+    """
+    local_start = "datetime(start_time / 1000, 'unixepoch', 'localtime')"
+    cursor.execute(f"SELECT DISTINCT date({local_start}) FROM activity_sessions WHERE app_name = ?", (app_name,))
+    days = [row[0] for row in cursor.fetchall()]
+    cursor.executemany(
+        "DELETE FROM activity_hourly WHERE day = ? AND app_name = ?",
+        [(day, app_name) for day in days]
+    )
+    cursor.execute(f"""
+        INSERT INTO activity_hourly (day, hour, app_name, category, duration_seconds, sessions)
+        SELECT date({local_start}),
+               CAST(strftime('%H', {local_start}) AS INTEGER),
+               app_name,
+               category,
+               SUM(duration_seconds),
+               COUNT(*)
+        FROM activity_sessions
+        WHERE app_name = ?
+        GROUP BY 1, 2, 3, 4
+    """, (app_name,))
+
 class ProductivityTracker:
-    def __init__(self, db_path: str = DB_NAME):
+    def __init__(self, db_path: str = DB_NAME, probe: Optional[WindowProbe] = None, clock=None,
+                 writer=None):
         self.db_path = db_path
+        # Writer opcional (writer.ActivityWriter) para gravação em lote fora do thread de amostragem
+        self.writer = writer
+        # Sonda de janela ativa (Win32 por padrão, criada sob demanda) e relógio
+        self.probe = probe
+        self.clock = clock or SystemClock()
+        # Ids e regras já carregados, reaproveitados pela gravação direta (sem writer)
+        self.interner = DimensionInterner()
         self._init_db()
         self.current_window = None
         self.start_time = None
@@ -32,19 +441,15 @@ class ProductivityTracker:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
+            # Vácuo incremental (só tem efeito em bancos novos; ver compaction.reclaim_space)
+            cursor.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+
             # Habilita Write-Ahead Logging
             cursor.execute("PRAGMA journal_mode=WAL;")
             
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS activity_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    app_name TEXT NOT NULL,
-                    window_title TEXT,
-                    start_time TIMESTAMP NOT NULL,
-                    end_time TIMESTAMP,
-                    duration_seconds REAL
-                )
-            """)
+            for ddl in DIMENSION_DDL:
+                cursor.execute(ddl)
+            cursor.execute(ACTIVITY_LOG_DDL)
             
             # --- MIGRAÇÃO DE ESQUEMA (Remover icon_path, renomear pretty_name) ---
             # Verifica colunas existentes na tabela app_settings
@@ -104,83 +509,311 @@ class ProductivityTracker:
                     )
                 """)
 
+            self._migrate_schema(cursor)
+            ensure_device_id(cursor)
+
             conn.commit()
+
+            # Atualiza estatísticas do planejador apenas quando necessário (barato se nada mudou)
+            cursor.execute("PRAGMA optimize;")
             conn.close()
             logging.info("Banco de dados inicializado com sucesso.")
         except sqlite3.Error as e:
             logging.error(f"Erro ao inicializar banco de dados: {e}")
 
-    def get_active_window_info(self) -> Tuple[Optional[str], Optional[str]]:
-        """Captura o nome do executável e o título da janela ativa."""
-        try:
-            hwnd = win32gui.GetForegroundWindow()
-            if not hwnd:
-                return None, None
+    def _migrate_schema(self, cursor):
+        """Aplica migrações versionadas (PRAGMA user_version) e garante os índices."""
+        cursor.execute("PRAGMA user_version")
+        version = cursor.fetchone()[0]
 
-            _, pid = win32process.GetWindowThreadProcessId(hwnd)
-            
-            try:
-                handle = win32api.OpenProcess(
-                    win32con.PROCESS_QUERY_INFORMATION | win32con.PROCESS_VM_READ,
-                    False, 
-                    pid
-                )
-                exe_path = win32process.GetModuleFileNameEx(handle, 0)
-                app_name = os.path.basename(exe_path)
-                win32api.CloseHandle(handle)
-            except Exception:
-                app_name = "System/Protected"
-
-            window_title = win32gui.GetWindowText(hwnd)
-            return app_name, window_title
-
-        except Exception as e:
-            logging.error(f"Erro ao capturar janela: {e}")
-            return None, None
+        # Bancos anteriores à versão 4 ainda guardam app_name/window_title no activity_log
+        cursor.execute("PRAGMA table_info(activity_log)")
+        needs_normalization = "app_name" in [info[1] for info in cursor.fetchall()]
+        if needs_normalization:
+            self._migrate_dimension_tables(cursor)
 
-    def save_activity(self, app_name: str, window_title: str, start: float, end: float):
-        """Salva o registro de atividade no banco."""
+        if version < 5:
+            self._migrate_title_rules(cursor)
+            # A visão ganhou a coluna clean_title
+            cursor.execute("DROP VIEW IF EXISTS activity_sessions")
+
+        if version < 6:
+            self._migrate_category_schema(cursor)
+            # A visão ganhou a coluna category
+            cursor.execute("DROP VIEW IF EXISTS activity_sessions")
+        cursor.execute(ACTIVITY_VIEW_DDL)
+
+        for ddl in ACTIVITY_INDEXES.values():
+            cursor.execute(ddl)
+        cursor.execute(HOURLY_ROLLUP_DDL)
+
+        if version < 1 or needs_normalization:
+            # Índices recém-criados: coleta estatísticas para o planejador escolhê-los
+            logging.info("Criando índices do activity_log e analisando o banco...")
+            cursor.execute("ANALYZE;")
+
+        if version < 2:
+            self._migrate_epoch_timestamps(cursor)
+
+        if version < 3:
+            logging.info("Construindo rollup por hora (activity_hourly)...")
+            rebuild_hourly_rollup(cursor)
+
+        if version < 6:
+            logging.info("Categorizando o histórico (category_rules)...")
+            recategorize_history(cursor)
+
+        if version < SCHEMA_VERSION:
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _migrate_dimension_tables(self, cursor):
+        """Move app_name/window_title do activity_log para as tabelas apps e window_titles."""
+        cursor.execute("SELECT COUNT(*) FROM activity_log")
+        logging.info(f"Normalizando {cursor.fetchone()[0]} registros (apps/window_titles)...")
+
+        cursor.execute("INSERT OR IGNORE INTO apps (name) SELECT DISTINCT app_name FROM activity_log")
+        cursor.execute("""
+            INSERT OR IGNORE INTO window_titles (title)
+            SELECT DISTINCT window_title FROM activity_log WHERE window_title IS NOT NULL
+        """)
+
+        # Os índices antigos acompanham a tabela renomeada e são removidos com ela
+        cursor.execute("ALTER TABLE activity_log RENAME TO activity_log_old")
+        cursor.execute(ACTIVITY_LOG_DDL)
+        cursor.execute("""
+            INSERT INTO activity_log (id, app_id, title_id, start_time, end_time, duration_seconds)
+            SELECT o.id, a.id, t.id, o.start_time, o.end_time, o.duration_seconds
+            FROM activity_log_old o
+            JOIN apps a ON a.name = o.app_name
+            LEFT JOIN window_titles t ON t.title = o.window_title
+            ORDER BY o.id
+        """)
+        cursor.execute("DROP TABLE activity_log_old")
+        logging.info("Normalização concluída.")
+
+    def _migrate_title_rules(self, cursor):
+        """Cria as regras padrão de limpeza e materializa window_titles.clean_title."""
+        cursor.execute("PRAGMA table_info(window_titles)")
+        if "clean_title" not in [info[1] for info in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE window_titles ADD COLUMN clean_title TEXT")
+
+        cursor.execute(TITLE_RULES_DDL)
+        cursor.execute("SELECT COUNT(*) FROM title_rules")
+        if cursor.fetchone()[0] == 0:
+            cursor.executemany(
+                "INSERT INTO title_rules (pattern, is_regex) VALUES (?, ?)",
+                [(pattern, int(is_regex)) for pattern, is_regex in DEFAULT_TITLE_RULES]
+            )
+        refresh_clean_titles(cursor, load_title_rules(cursor))
+
+    def _migrate_category_schema(self, cursor):
+        """Cria as regras padrão de categorização, a coluna category_id e a categoria no rollup."""
+        cursor.execute("PRAGMA table_info(activity_log)")
+        if "category_id" not in [info[1] for info in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE activity_log ADD COLUMN category_id INTEGER REFERENCES categories (id)")
+
+        cursor.execute(CATEGORY_RULES_DDL)
+        cursor.execute("SELECT COUNT(*) FROM category_rules")
+        if cursor.fetchone()[0] == 0:
+            cursor.executemany(
+                "INSERT INTO category_rules (field, pattern, is_regex, category) VALUES (?, ?, ?, ?)",
+                [(field, pattern, int(is_regex), category)
+                 for field, pattern, is_regex, category in DEFAULT_CATEGORY_RULES]
+            )
+
+        # O rollup passa a ser por categoria também (a chave primária muda: recria a tabela).
+        # Dias sem registros brutos (arquivados) ficam com a categoria manual do app.
+        cursor.execute("PRAGMA table_info(activity_hourly)")
+        rollup_columns = [info[1] for info in cursor.fetchall()]
+        if rollup_columns and "category" not in rollup_columns:
+            cursor.execute("ALTER TABLE activity_hourly RENAME TO activity_hourly_old")
+            cursor.execute(HOURLY_ROLLUP_DDL)
+            cursor.execute(f"""
+                INSERT INTO activity_hourly (day, hour, app_name, category, duration_seconds, sessions)
+                SELECT h.day, h.hour, h.app_name, COALESCE(s.category, '{UNCATEGORIZED}'),
+                       h.duration_seconds, h.sessions
+                FROM activity_hourly_old h
+                LEFT JOIN app_settings s ON s.app_name = h.app_name
+            """)
+            cursor.execute("DROP TABLE activity_hourly_old")
+
+    def _migrate_epoch_timestamps(self, cursor):
+        """Converte start_time/end_time gravados como texto (datetime local) para epoch em ms."""
+        cursor.execute("SELECT COUNT(*) FROM activity_log WHERE typeof(start_time) = 'text'")
+        pending = cursor.fetchone()[0]
+        if not pending:
+            return
+
+        logging.info(f"Migrando {pending} registros para timestamps em epoch (ms)...")
+        # O modificador 'utc' interpreta o texto como hora local, como foi gravado pelo tracker
+        epoch_ms = "CAST(ROUND((julianday({col}, 'utc') - 2440587.5) * 86400000) AS INTEGER)"
+        cursor.execute("""
+            DELETE FROM activity_log
+            WHERE typeof(start_time) = 'text' AND julianday(start_time) IS NULL
+        """)
+        if cursor.rowcount:
+            logging.warning(f"{cursor.rowcount} registros com data ilegível foram descartados.")
+        cursor.execute(f"""
+            UPDATE activity_log
+            SET start_time = {epoch_ms.format(col='start_time')},
+                end_time = CASE WHEN typeof(end_time) = 'text'
+                                THEN {epoch_ms.format(col='end_time')}
+                                ELSE end_time END
+            WHERE typeof(start_time) = 'text'
+        """)
+        logging.info("Migração de timestamps concluída.")
+
+    def rebuild_rollup(self, day: Optional[str] = None) -> bool:
+        """Reconstrói o rollup por hora a partir dos registros brutos."""
         try:
             conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            current_start = start
-            while current_start < end:
-                dt_start = datetime.datetime.fromtimestamp(current_start)
-                next_hour = (dt_start + datetime.timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
-                ts_next_hour = next_hour.timestamp()
-                
-                current_end = min(end, ts_next_hour)
-                duration = current_end - current_start
-                
-                if duration >= 1.0:
-                    cursor.execute("""
-                        INSERT INTO activity_log (app_name, window_title, start_time, end_time, duration_seconds)
-                        VALUES (?, ?, ?, ?, ?)
-                    """, (app_name, window_title, 
-                          datetime.datetime.fromtimestamp(current_start), 
-                          datetime.datetime.fromtimestamp(current_end), 
-                          duration))
-                
-                current_start = current_end
-
+            rebuild_hourly_rollup(conn.cursor(), day)
             conn.commit()
             conn.close()
+            return True
         except sqlite3.Error as e:
-            logging.error(f"Erro ao salvar atividade: {e}")
+            logging.error(f"Erro ao reconstruir rollup: {e}")
+            return False
+
+    def explain_query_plan(self, sql: str, params: tuple = ()) -> List[str]:
+        """Retorna as linhas de detalhe do EXPLAIN QUERY PLAN de uma consulta."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        finally:
+            conn.close()
+        return [row[-1] for row in rows]
+
+    def check_query_plans(self) -> bool:
+        """Verifica se as consultas do dashboard usam os índices esperados."""
+        # Import tardio: queries importa este módulo
+        from queries import query_plan_checks
+
+        ok = True
+        for name, (sql, params, expected) in {**QUERY_PLAN_CHECKS, **query_plan_checks()}.items():
+            plan = self.explain_query_plan(sql, params)
+            uses_index = (any(fragment in detail for fragment in expected for detail in plan)
+                          and not any(TEMP_BTREE_PLAN in detail for detail in plan))
+            level = logging.INFO if uses_index else logging.WARNING
+            logging.log(level, f"Plano de '{name}' ({'OK' if uses_index else 'SEM ÍNDICE'}): {' | '.join(plan)}")
+            ok = ok and uses_index
+        return ok
+
+    def get_active_window_info(self) -> Tuple[Optional[str], Optional[str]]:
+        """Captura o nome do executável e o título da janela ativa via sonda configurada."""
+        if self.probe is None:
+            from probes import Win32WindowProbe
+            self.probe = Win32WindowProbe()
+        return self.probe.sample()
+
+    def get_idle_seconds(self) -> Optional[float]:
+        """Segundos sem entrada do usuário, segundo a sonda (None se ela não informar)."""
+        return self.probe.idle_seconds() if self.probe is not None else None
+
+    def save_activity(self, app_name: str, window_title: str, start: float, end: float):
+        """Salva o registro de atividade no banco (via writer em segundo plano, se houver)."""
+        with span("tracker.save_activity"):
+            if self.writer is not None and self.writer.is_running():
+                self.writer.submit(app_name, window_title, start, end)
+                return
+
+            try:
+                conn = sqlite3.connect(self.db_path)
+                cursor = conn.cursor()
+                # Só recompila se as regras mudaram (ex.: editadas no dashboard)
+                self.interner.refresh_title_rules(cursor)
+                self.interner.refresh_category_rules(cursor)
+                insert_activity(cursor, app_name, window_title, start, end, self.interner)
+                conn.commit()
+                conn.close()
+            except sqlite3.Error as e:
+                # Ids criados na transação desfeita deixam de existir
+                self.interner.clear()
+                logging.error(f"Erro ao salvar atividade: {e}")
 
     def get_all_apps(self):
         """Retorna lista de todos os apps registrados no log."""
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
-            cursor.execute("SELECT DISTINCT app_name FROM activity_log ORDER BY app_name")
+            cursor.execute(GET_ALL_APPS_SQL)
             apps = [row[0] for row in cursor.fetchall()]
             conn.close()
             return apps
         except sqlite3.Error:
             return []
 
+    def get_title_rules(self) -> List[TitleRule]:
+        """Retorna as regras de limpeza de títulos."""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            rules = load_title_rules(conn.cursor())
+            conn.close()
+            return rules
+        except sqlite3.Error:
+            return []
+
+    def update_title_rules(self, rules: List[TitleRule]) -> bool:
+        """Substitui as regras de limpeza e recalcula os títulos limpos já gravados."""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM title_rules")
+            cursor.executemany(
+                "INSERT INTO title_rules (pattern, is_regex) VALUES (?, ?)",
+                [(pattern, int(is_regex)) for pattern, is_regex in rules]
+            )
+            changed = refresh_clean_titles(cursor, rules)
+            conn.commit()
+            conn.close()
+            logging.info(f"Regras de título atualizadas ({changed} títulos recalculados).")
+            return True
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao atualizar regras de título: {e}")
+            return False
+
+    def get_category_rules(self) -> List[CategoryRule]:
+        """Retorna as regras de categorização, na ordem de prioridade."""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            rules = load_category_rules(conn.cursor())
+            conn.close()
+            return rules
+        except sqlite3.Error:
+            return []
+
+    def update_category_rules(self, rules: List[CategoryRule]) -> bool:
+        """Substitui as regras de categorização e recategoriza o histórico."""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM category_rules")
+            cursor.executemany(
+                "INSERT INTO category_rules (field, pattern, is_regex, category) VALUES (?, ?, ?, ?)",
+                [(field, pattern, int(is_regex), category) for field, pattern, is_regex, category in rules]
+            )
+            changed = recategorize_history(cursor)
+            conn.commit()
+            conn.close()
+            logging.info(f"Regras de categoria atualizadas ({changed} registros recategorizados).")
+            return True
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao atualizar regras de categoria: {e}")
+            return False
+
+    def recategorize(self) -> bool:
+        """Reaplica as regras de categorização a todo o histórico."""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            changed = recategorize_history(conn.cursor())
+            conn.commit()
+            conn.close()
+            logging.info(f"Recategorização concluída: {changed} registros alterados.")
+            return True
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao recategorizar histórico: {e}")
+            return False
+
     def get_app_settings(self):
         """Retorna dicionário com configurações dos apps."""
         settings = {}
@@ -205,10 +838,15 @@ class ProductivityTracker:
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
+            cursor.execute("SELECT category FROM app_settings WHERE app_name = ?", (app_name,))
+            previous = cursor.fetchone()
             cursor.execute("""
                 INSERT OR REPLACE INTO app_settings (app_name, display_name, hex_color, category)
                 VALUES (?, ?, ?, ?)
             """, (app_name, display_name, hex_color, category))
+            # A categoria manual é o fallback das regras: as sessões do app são recategorizadas
+            if (previous[0] if previous else None) != category:
+                recategorize_history(cursor, app_name)
             conn.commit()
             conn.close()
             return True
@@ -216,27 +854,87 @@ class ProductivityTracker:
             logging.error(f"Erro ao atualizar settings: {e}")
             return False
 
-    def run(self):
-        """Loop principal de monitoramento."""
+    def run(self, max_samples: Optional[int] = None, interval: float = 5, scheduler=None):
+        """
+        Loop principal de monitoramento (ingest.IngestEngine). O intervalo entre amostras é
+        adaptativo, limitado a `interval` segundos enquanto há atividade.
+        """
+        from ingest import IngestEngine
+
         logging.info("Iniciando monitoramento...")
-        self.start_time = time.time()
-        last_app = None
-        last_title = None
-        
-        try:
-            while True:
-                current_app, current_title = self.get_active_window_info()
-                if current_app != last_app or current_title != last_title:
-                    end_time = time.time()
-                    if last_app is not None:
-                        self.save_activity(last_app, last_title, self.start_time, end_time)
-                    self.start_time = end_time
-                    last_app = current_app
-                    last_title = current_title
-                time.sleep(5)
-        except KeyboardInterrupt:
-            pass
+        if scheduler is not None:
+            engine = IngestEngine(self, scheduler=scheduler)
+        else:
+            engine = IngestEngine.with_interval(self, interval)
+        return engine.run(max_samples)
+
+def run_synthetic(db_path: str, samples: int, interval: float, seed: int = 0,
+                  use_writer: bool = False, wall_clock: bool = False):
+    """
+    Executa o tracker com sonda sintética e relógio virtual, medindo o custo da ingestão.
+    O relógio parte de um instante fixo (execuções reproduzíveis); `wall_clock` o inicia no horário atual.
+    """
+    from probes import SYNTHETIC_START_EPOCH, SyntheticWindowProbe, VirtualClock
+
+    clock = VirtualClock(time.time() if wall_clock else SYNTHETIC_START_EPOCH)
+    probe = SyntheticWindowProbe(clock, seed=seed)
+    tracker = ProductivityTracker(db_path, probe=probe, clock=clock)
+    if use_writer:
+        from writer import ActivityWriter
+        tracker.writer = ActivityWriter(db_path)
+        tracker.writer.start()
+
+    started = time.perf_counter()
+    tracker.run(max_samples=samples, interval=interval)
+    if tracker.writer is not None:
+        tracker.writer.close()
+    elapsed = time.perf_counter() - started
+
+    rate = samples / elapsed if elapsed > 0 else float("inf")
+    logging.info(
+        f"Sintético: {samples} amostras, {probe.switches} trocas em {elapsed:.3f}s "
+        f"({rate:.0f} amostras/s)"
+    )
+    return elapsed
 
 if __name__ == "__main__":
-    tracker = ProductivityTracker()
-    tracker.run()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Monitor de janelas ativas")
+    parser.add_argument("--db", default=DB_NAME, help="Caminho do banco SQLite")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="Usa sonda sintética com relógio virtual (headless)")
+    parser.add_argument("--samples", type=int, default=10000, help="Amostras no modo sintético")
+    parser.add_argument("--interval", type=float, default=5.0,
+                        help="Intervalo máximo entre amostras (s) com o usuário ativo")
+    parser.add_argument("--seed", type=int, default=0, help="Semente da sonda sintética")
+    parser.add_argument("--writer", action="store_true", help="Grava via ActivityWriter (group commit)")
+    parser.add_argument("--wall-clock", action="store_true",
+                        help="No modo sintético, inicia o relógio virtual no horário atual (padrão: instante fixo)")
+    parser.add_argument("--check-plans", action="store_true",
+                        help="Verifica se as consultas do dashboard usam os índices")
+    parser.add_argument("--rebuild-rollup", nargs="?", const="", metavar="DIA",
+                        help="Reconstrói o rollup por hora (todo o histórico ou um dia YYYY-MM-DD)")
+    parser.add_argument("--recategorize", action="store_true",
+                        help="Reaplica as regras de categorização a todo o histórico")
+    parser.add_argument("--profile-out", default=None, metavar="ARQUIVO",
+                        help="Grava os tempos medidos (JSON) ao final da execução")
+    args = parser.parse_args()
+
+    if args.rebuild_rollup is not None:
+        ok = ProductivityTracker(args.db).rebuild_rollup(args.rebuild_rollup or None)
+        raise SystemExit(0 if ok else 1)
+    elif args.recategorize:
+        raise SystemExit(0 if ProductivityTracker(args.db).recategorize() else 1)
+    elif args.check_plans:
+        raise SystemExit(0 if ProductivityTracker(args.db).check_query_plans() else 1)
+    elif args.synthetic:
+        run_synthetic(args.db, args.samples, args.interval, args.seed, use_writer=args.writer,
+                      wall_clock=args.wall_clock)
+    else:
+        tracker = ProductivityTracker(args.db)
+        tracker.run()
+
+    if args.profile_out:
+        from profiling import dump_json
+        dump_json(args.profile_out)
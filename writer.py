@@ -0,0 +1,230 @@
+import queue
+import sqlite3
+import threading
+import time
+import logging
+from typing import List, Optional, Tuple
+
+from profiling import TIMINGS
+from tracker import DB_NAME, DimensionInterner, insert_activity
+
+# Sessão pendente de gravação: (app_name, window_title, início, fim) em epoch (s)
+PendingActivity = Tuple[str, str, float, float]
+
+# Espera (s) do SQLite pelo lock de escrita antes de desistir do commit
+BUSY_TIMEOUT = 30.0
+# Com o banco ocupado, o lote é mantido e o commit é repetido com espera crescente (s)
+RETRY_INITIAL_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+# Tempo máximo (s) tentando gravar o que resta ao encerrar
+CLOSE_RETRY_TIMEOUT = 30.0
+
+
+class _FlushRequest:
+    """Marcador colocado na fila para forçar um commit imediato."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        # False se o lote ficou na fila (banco ocupado) ou foi descartado por erro
+        self.ok = False
+
+
+_STOP = object()
+
+
+def is_busy_error(error: sqlite3.Error) -> bool:
+    """Erro transitório de concorrência (outra conexão com o lock de escrita)."""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+
+class ActivityWriter:
+    """
+    Gravador em segundo plano do activity_log (group commit).
+
+    O thread de amostragem apenas enfileira as sessões; um thread dedicado com
+    conexão de longa duração agrupa os INSERTs e faz commit quando o lote atinge
+    `batch_size` linhas ou quando a sessão mais antiga espera `flush_interval` segundos.
+    """
+
+    def __init__(self, db_path: str = DB_NAME, batch_size: int = 50, flush_interval: float = 2.0):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        # Ids de apps/títulos já gravados (válido apenas para a conexão do writer)
+        self.interner = DimensionInterner()
+
+        # Métricas
+        self._stats_lock = threading.Lock()
+        self.commits = 0
+        self.rows_written = 0
+        self.errors = 0
+        self.retries = 0
+        self.dropped = 0
+        self.max_queue_depth = 0
+        self.last_commit_ms = 0.0
+        self.max_commit_ms = 0.0
+        self._total_commit_ms = 0.0
+
+    # --- API usada pelo tracker ---
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="ActivityWriter", daemon=True)
+        self._thread.start()
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, app_name: str, window_title: str, start: float, end: float):
+        """Enfileira uma sessão para gravação (não bloqueia)."""
+        self._queue.put((app_name, window_title, start, end))
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """
+        Força o commit de tudo que já foi enfileirado e aguarda a conclusão.
+        Retorna True só se tudo foi gravado; False em timeout, banco ocupado (o lote continua
+        pendente e será repetido) ou erro de gravação.
+        """
+        if not self.is_running():
+            return False
+        request = _FlushRequest()
+        self._queue.put(request)
+        return request.done.wait(timeout) and request.ok
+
+    def close(self, timeout: Optional[float] = CLOSE_RETRY_TIMEOUT + BUSY_TIMEOUT):
+        """Grava as sessões pendentes e encerra o thread."""
+        if not self.is_running():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        logging.info(f"Writer encerrado: {self.stats()}")
+
+    def stats(self) -> dict:
+        """Retorna profundidade da fila e latência dos commits."""
+        with self._stats_lock:
+            avg_ms = self._total_commit_ms / self.commits if self.commits else 0.0
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "commits": self.commits,
+                "rows_written": self.rows_written,
+                "errors": self.errors,
+                "retries": self.retries,
+                "dropped": self.dropped,
+                "last_commit_ms": round(self.last_commit_ms, 3),
+                "avg_commit_ms": round(avg_ms, 3),
+                "max_commit_ms": round(self.max_commit_ms, 3),
+            }
+
+    # --- Thread do writer ---
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT)
+        # Em WAL, synchronous=NORMAL mantém a durabilidade por commit sem fsync a cada INSERT
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        pending: List[PendingActivity] = []
+        # Momento do próximo commit por tempo (flush_interval após a primeira sessão, ou do retry)
+        due_at = 0.0
+        retry_delay = 0.0
+
+        try:
+            while True:
+                timeout = max(0.0, due_at - time.monotonic()) if pending else None
+
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is _STOP:
+                    self._commit_on_close(conn, pending)
+                    break
+
+                if isinstance(item, _FlushRequest):
+                    errors = self.errors
+                    committed = self._commit(conn, pending)
+                    if committed:
+                        pending = []
+                        retry_delay = 0.0
+                    item.ok = committed and self.errors == errors
+                    item.done.set()
+                    continue
+
+                if item is not None:
+                    if not pending:
+                        due_at = time.monotonic() + self.flush_interval
+                    pending.append(item)
+
+                # Em espera de retry, o lote cheio não força um commit antes da hora
+                full = len(pending) >= self.batch_size and not retry_delay
+                if pending and (full or time.monotonic() >= due_at):
+                    if self._commit(conn, pending):
+                        pending = []
+                        retry_delay = 0.0
+                    else:
+                        retry_delay = min(max(retry_delay * 2, RETRY_INITIAL_DELAY), RETRY_MAX_DELAY)
+                        due_at = time.monotonic() + retry_delay
+                        logging.warning(f"Banco ocupado; {len(pending)} sessões mantidas, nova tentativa em {retry_delay:.1f}s")
+        finally:
+            conn.close()
+
+    def _commit_on_close(self, conn: sqlite3.Connection, pending: List[PendingActivity]):
+        """Último commit ao encerrar, repetido por até CLOSE_RETRY_TIMEOUT se o banco estiver ocupado."""
+        deadline = time.monotonic() + CLOSE_RETRY_TIMEOUT
+        delay = RETRY_INITIAL_DELAY
+        while not self._commit(conn, pending):
+            if time.monotonic() + delay > deadline:
+                with self._stats_lock:
+                    self.dropped += len(pending)
+                logging.error(f"Banco ocupado ao encerrar: {len(pending)} sessões não foram gravadas.")
+                return
+            time.sleep(delay)
+            delay = min(delay * 2, RETRY_MAX_DELAY)
+
+    def _commit(self, conn: sqlite3.Connection, pending: List[PendingActivity]) -> bool:
+        """
+        Grava o lote em uma transação. Retorna False se o banco estava ocupado (lock/busy):
+        o lote deve ser mantido e repetido. Outros erros descartam o lote (True).
+        """
+        if not pending:
+            return True
+        started = time.perf_counter()
+        try:
+            cursor = conn.cursor()
+            # Regras de limpeza/categorização podem ter sido editadas no dashboard
+            self.interner.refresh_title_rules(cursor)
+            self.interner.refresh_category_rules(cursor)
+            rows = 0
+            for app_name, window_title, start, end in pending:
+                rows += insert_activity(cursor, app_name, window_title, start, end, self.interner)
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            # Ids criados na transação desfeita deixam de existir
+            self.interner.clear()
+            if is_busy_error(e):
+                with self._stats_lock:
+                    self.retries += 1
+                return False
+            with self._stats_lock:
+                self.errors += 1
+                self.dropped += len(pending)
+            logging.error(f"Erro ao gravar lote de atividades ({len(pending)} sessões): {e}")
+            return True
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        TIMINGS.record("writer.commit", elapsed_ms)
+        with self._stats_lock:
+            self.commits += 1
+            self.rows_written += rows
+            self.last_commit_ms = elapsed_ms
+            self.max_commit_ms = max(self.max_commit_ms, elapsed_ms)
+            self._total_commit_ms += elapsed_ms
+        return True